@@ -16,10 +16,14 @@ import argparse
 import cv2
 import numpy as np
 import os
+import queue
 import sys
+import threading
 import time
 import logging
 import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Optional
 import platform
@@ -33,9 +37,44 @@ from dotenv import load_dotenv
 
 from elo_utils import calculate_elo_update_for_streaming, update_inactivity_status
 
+# Optional: ffmpegcv decodes H.264/H.265 on the GPU (NVDEC) instead of
+# burning CPU cores in cv2.VideoCapture; fall back to OpenCV when unavailable
+try:
+    import ffmpegcv
+    FFMPEGCV_AVAILABLE = True
+except ImportError:
+    FFMPEGCV_AVAILABLE = False
+
+# Optional: Numba fuses the ROI scoring (gray conversion + threshold + count)
+# into a single compiled pass; fall back to the OpenCV path when unavailable
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def _bright_ratio_bgr(bgr, thresh):
+        """Fraction of pixels whose approximate luma exceeds thresh."""
+        h, w = bgr.shape[0], bgr.shape[1]
+        count = 0
+        for y in prange(h):
+            row_count = 0
+            for x in range(w):
+                luma = (int(bgr[y, x, 0]) + 2 * int(bgr[y, x, 1]) + int(bgr[y, x, 2])) >> 2
+                if luma > thresh:
+                    row_count += 1
+            count += row_count
+        return count / (h * w)
+
 # Load environment variables
 load_dotenv()
 
+# Placeholder names ("Player 1", "P1", "P 1") mean Gemini couldn't identify
+# the player; compiled once instead of three re.match calls per player
+UNKNOWN_NAME_RE = re.compile(r"^(?:Player \d+|P ?\d+)$")
+
 
 class PlayerStats(BaseModel):
     is_online_match: bool
@@ -88,24 +127,28 @@ def get_file_creation_time(filepath: str) -> datetime:
     return datetime.fromtimestamp(timestamp)
 
 
-def get_video_files(directory: str) -> List[str]:
-    """Get all video files in a directory, sorted by filename."""
-    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
 
-    files = []
-    for filename in os.listdir(directory):
-        if filename.lower().endswith(video_extensions):
-            files.append(os.path.join(directory, filename))
 
-    files.sort(key=lambda x: os.path.basename(x))
-    return files
+def get_video_files(directory: str) -> List[str]:
+    """Get all video files in a directory, sorted by filename."""
+    # scandir avoids materializing the full listing up front and its
+    # DirEntry objects carry cached stat info
+    with os.scandir(directory) as entries:
+        return sorted(
+            (entry.path for entry in entries
+             if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS)),
+            key=os.path.basename,
+        )
 
 
 class BatchVideoProcessor:
-    def __init__(self, directory: str, slowdown_factor: int = 10, dry_run: bool = False):
+    def __init__(self, directory: str, slowdown_factor: int = 10, dry_run: bool = False,
+                 workers: Optional[int] = None):
         self.directory = directory
         self.slowdown_factor = slowdown_factor
         self.dry_run = dry_run
+        self.workers = workers if workers else max(1, (os.cpu_count() or 2) // 2)
         self.processed_count = 0
         self.skipped_count = 0
         self.failed_count = 0
@@ -148,19 +191,43 @@ class BatchVideoProcessor:
         self.logger.info(f"Slowdown factor: {self.slowdown_factor}")
         self.logger.info(f"Dry run: {self.dry_run}")
 
-    def detect_game_end(self, frame) -> tuple:
+    def detect_game_end(self, frame, roi: Optional[tuple] = None) -> tuple:
         """
         Detect game end by looking for 'GAME!' text or victory screen elements
         (Same logic as capture_card_processor.py)
+
+        roi is an optional precomputed (y0, y1, x0, x1) so per-frame callers
+        don't redo the region arithmetic on every frame.
         """
         try:
-            h, w = frame.shape[:2]
-            game_region = frame[int(h*self.game_region_top):int(h*self.game_region_bottom),
-                               int(w*self.game_region_left):int(w*self.game_region_right)]
-
-            gray_game = cv2.cvtColor(game_region, cv2.COLOR_BGR2GRAY)
-            bright_mask = gray_game > 200
-            bright_ratio = np.sum(bright_mask) / (bright_mask.shape[0] * bright_mask.shape[1])
+            if roi is None:
+                h, w = frame.shape[:2]
+                roi = (int(h*self.game_region_top), int(h*self.game_region_bottom),
+                       int(w*self.game_region_left), int(w*self.game_region_right))
+
+            y0, y1, x0, x1 = roi
+            game_region = frame[y0:y1, x0:x1]
+
+            # Downscale the ROI first -- the brightness ratio is a coarse
+            # statistic, so a 160x90 thumbnail gives the same answer for a
+            # fraction of the memory traffic
+            small = cv2.resize(game_region, (160, 90), interpolation=cv2.INTER_AREA)
+
+            if NUMBA_AVAILABLE and small.ndim == 3:
+                # Single fused pass over the BGR ROI, no intermediate arrays
+                bright_ratio = _bright_ratio_bgr(small, 200)
+            else:
+                # Luma-only frames (from a grayscale-decoding backend) skip
+                # the BGR->gray conversion entirely
+                if small.ndim == 2:
+                    gray_game = small
+                else:
+                    gray_game = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+                # countNonZero on a thresholded mask keeps the whole reduction
+                # in OpenCV's SIMD path instead of materializing numpy
+                # temporaries
+                _, bright_mask = cv2.threshold(gray_game, 200, 1, cv2.THRESH_BINARY)
+                bright_ratio = cv2.countNonZero(bright_mask) / bright_mask.size
 
             confidence = bright_ratio
             return confidence, confidence >= self.game_end_confidence_threshold
@@ -170,121 +237,199 @@ class BatchVideoProcessor:
 
     def extract_result_screen(self, video_path: str) -> tuple:
         """
-        Extract the result screen portion from a full match video.
-        Returns (result_screen_frames, frame_42_image, fps) or (None, None, None) on failure.
+        Locate the result screen portion of a full match video.
+        Returns (start_frame, frame_42_image, fps) or (None, None, None) on failure.
         """
         self.logger.info(f"Extracting result screen from: {video_path}")
 
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            self.logger.error(f"Failed to open video: {video_path}")
-            return None, None, None
+        # Prefer NVDEC decode when ffmpegcv is installed and a GPU is present
+        cap = None
+        use_nvdec = False
+        if FFMPEGCV_AVAILABLE:
+            try:
+                cap = ffmpegcv.VideoCaptureNV(video_path)
+                use_nvdec = True
+                self.logger.info("Using NVDEC hardware decode via ffmpegcv")
+            except Exception as e:
+                self.logger.info(f"ffmpegcv NVDEC unavailable ({e}), using cv2.VideoCapture")
+                cap = None
+
+        if cap is None:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                self.logger.error(f"Failed to open video: {video_path}")
+                return None, None, None
+
+        if use_nvdec:
+            fps = int(getattr(cap, 'fps', 0) or 0)
+            width = int(getattr(cap, 'width', 0) or 0)
+            height = int(getattr(cap, 'height', 0) or 0)
+            total_frames = int(getattr(cap, 'count', 0) or 0)
+        else:
+            fps = int(cap.get(cv2.CAP_PROP_FPS))
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
         if fps <= 0:
             fps = 30
 
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
         self.logger.info(f"Video: {width}x{height} @ {fps}fps, {total_frames} frames")
 
-        # Store frames and their game end confidence scores
-        frames = []
-        scores = []
+        # ROI bounds are constant for the whole video; compute them once
+        # instead of per frame (detect_game_end derives them per frame if the
+        # backend didn't report dimensions)
+        roi = None
+        if width > 0 and height > 0:
+            roi = (int(height*self.game_region_top), int(height*self.game_region_bottom),
+                   int(width*self.game_region_left), int(width*self.game_region_right))
+
+        # First pass keeps only confidence scores and frame indices -- the
+        # chosen tail is remuxed afterwards, so we never hold thousands of
+        # full BGR frames in memory. deque(maxlen=...) gives O(1) eviction
+        # from the left instead of list slicing.
+        max_scores = 3600  # ~2 minutes of scored frames at 60fps/skip=2
+        scores = deque(maxlen=max_scores)
+        kept_indices = deque(maxlen=max_scores)
         frame_42_image = None
-        frame_count = 0
-        frame_skip_interval = 2  # Store every 2nd frame
-        max_frames = 3600  # ~1 minute at 60fps
+        frame_skip_interval = 2  # Score every 2nd frame
+
+        # Run the decoder on its own thread so ffmpeg's demux/decode overlaps
+        # with the scoring below. The bounded queue keeps at most 32 decoded
+        # frames in flight.
+        frame_queue = queue.Queue(maxsize=32)
+
+        # The result screen always sits in the tail of a recording, so skip
+        # scoring the first 60% of the video outright (frame 42 is still
+        # captured for player identification). When the frame count is
+        # unknown, score everything as before.
+        score_start = int(total_frames * 0.6) if total_frames > 0 else 0
+
+        def wanted(count):
+            if count == 42:
+                return True
+            return count > score_start and count % frame_skip_interval == 0
+
+        def decode_frames():
+            count = 0
+            if use_nvdec:
+                # ffmpegcv has no grab()/retrieve() split, but NVDEC decode
+                # is cheap enough that reading every frame is fine
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    count += 1
+                    if wanted(count):
+                        frame_queue.put((count, frame))
+            else:
+                while cap.grab():
+                    count += 1
+                    # grab() advances the decoder without producing a frame;
+                    # only retrieve() (the expensive decode + BGR conversion)
+                    # the frames we actually keep or score
+                    if not wanted(count):
+                        continue
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        frame_queue.put((count, frame))
+            frame_queue.put(None)
+
+        decoder_thread = threading.Thread(target=decode_frames, daemon=True)
+        decoder_thread.start()
 
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            item = frame_queue.get()
+            if item is None:
                 break
 
-            frame_count += 1
+            frame_count, frame = item
+
+            # Progress update every 1000 frames
+            if frame_count % 1000 == 0:
+                self.logger.info(f"Processed {frame_count}/{total_frames} frames...")
 
             # Capture frame 42 for player identification
             if frame_count == 42:
-                frame_42_image = frame.copy()
+                # retrieve() returns a fresh buffer per call, so no copy needed
+                frame_42_image = frame
                 self.logger.info("Captured frame 42 for player identification")
 
-            # Get game end confidence
-            confidence, _ = self.detect_game_end(frame)
-
-            # Store every nth frame
-            if frame_count % frame_skip_interval == 0:
-                frames.append(frame.copy())
+            # Score every nth frame past the skip window. Frame 42 is even,
+            # so without the score_start gate it would sneak into scores and
+            # could win best-frame selection from ~40% into the match.
+            if frame_count > score_start and frame_count % frame_skip_interval == 0:
+                confidence, _ = self.detect_game_end(frame, roi)
                 scores.append(confidence)
+                kept_indices.append(frame_count)
 
-                # Limit memory usage
-                if len(frames) > max_frames:
-                    chunk_size = min(50, len(frames) // 4)
-                    frames = frames[chunk_size:]
-                    scores = scores[chunk_size:]
-
-            # Progress update every 1000 frames
-            if frame_count % 1000 == 0:
-                self.logger.info(f"Processed {frame_count}/{total_frames} frames...")
+        decoder_thread.join()
 
-        cap.release()
-
-        if not frames or not scores:
+        if not scores:
+            cap.release()
             self.logger.warning("No frames captured from video")
             return None, None, None
 
-        # Find the last frame with highest game end confidence above threshold
-        best_frame_index = -1
-        best_confidence = 0.0
+        # One O(N) conversion for random access during selection
+        kept_indices = list(kept_indices)
 
-        for i in range(len(scores) - 1, -1, -1):
-            confidence = scores[i]
-            if confidence >= self.game_end_confidence_threshold and confidence > best_confidence:
-                best_confidence = confidence
-                best_frame_index = i
-                break
+        # Find the last frame with game end confidence above threshold. (The
+        # old reverse scan broke on its first hit anyway, so this is the same
+        # answer from a single vectorized pass.)
+        score_arr = np.fromiter(scores, dtype=np.float32, count=len(scores))
+        hits = np.where(score_arr >= self.game_end_confidence_threshold)[0]
+        best_frame_index = int(hits[-1]) if hits.size else -1
+        best_confidence = float(score_arr[best_frame_index]) if hits.size else 0.0
 
         if best_frame_index == -1:
+            cap.release()
             self.logger.warning("No frame found with game end confidence above threshold")
             return None, None, None
 
-        # Extract frames from the best frame to the end
-        result_frames = frames[best_frame_index:]
+        cap.release()
 
-        if len(result_frames) < 15:  # Less than ~0.5 seconds
-            self.logger.warning(f"Result screen sequence too short ({len(result_frames)} frames)")
-            return None, None, None
+        start_frame = kept_indices[best_frame_index] - 1  # 0-based index
 
-        self.logger.info(f"Extracted {len(result_frames)} result screen frames (confidence: {best_confidence:.3f})")
+        tail_frames = kept_indices[-1] - start_frame
+        if tail_frames < 15:  # Less than ~0.5 seconds
+            self.logger.warning(f"Result screen sequence too short ({tail_frames} frames)")
+            return None, None, None
 
-        return result_frames, frame_42_image, fps
+        self.logger.info(f"Result screen starts at frame {start_frame} (confidence: {best_confidence:.3f})")
 
-    def create_result_video(self, frames: List, fps: int, source_filename: str) -> Optional[str]:
-        """Create a result screen video file and save to result_screens directory."""
-        if not frames:
-            return None
+        return start_frame, frame_42_image, fps
 
+    def create_result_video(self, video_path: str, start_frame: int, fps: int, source_filename: str) -> Optional[str]:
+        """Cut the result screen tail from the source video into result_screens."""
         # Create filename based on source video name
         base_name = os.path.splitext(source_filename)[0]
         result_filename = f"{base_name}_result_screen.mp4"
         result_path = os.path.join(self.result_screens_dir, result_filename)
 
-        height, width = frames[0].shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(result_path, fourcc, fps, (width, height))
+        # The result screen is a contiguous tail of the source file, so remux
+        # it with stream copy instead of decoding and re-encoding the frames
+        start_time = start_frame / float(fps)
+        ffmpeg_cmd = f"ffmpeg -y -ss {start_time:.3f} -i \"{video_path}\" -c copy -an \"{result_path}\" -loglevel quiet"
 
-        if not out.isOpened():
-            self.logger.error("Failed to create video writer")
+        if os.system(ffmpeg_cmd) != 0:
+            self.logger.error("Failed to cut result screen video with ffmpeg")
             return None
 
-        for frame in frames:
-            out.write(frame)
-
-        out.release()
         self.logger.info(f"Saved result screen video: {result_filename}")
         return result_path
 
+    def _wait_until_active(self, uploaded_file):
+        """Poll a Gemini file until it is ACTIVE, backing off exponentially."""
+        # Start at 100ms so fast-processed files aren't stuck waiting out a
+        # full second; cap at 2s so slow ones aren't hammered
+        delay = 0.1
+        while True:
+            file_info = gemini_client.files.get(name=uploaded_file.name)
+            if file_info.state == "ACTIVE":
+                return
+            time.sleep(delay)
+            delay = min(delay * 1.5, 2.0)
+
     def get_match_stats(self, result_video_path: str, frame_42_path: Optional[str] = None) -> Optional[List[PlayerStats]]:
         """Extract player stats from result screen video using Gemini API"""
         if not gemini_client:
@@ -294,17 +439,17 @@ class BatchVideoProcessor:
         try:
             self.logger.info(f"Processing result screen video for Gemini...")
 
-            # Slow down the video
-            final_video_filepath = os.path.join(tempfile.gettempdir(), "temp_slowed_video.mp4")
+            # Slow down the video (unique temp name so videos can be
+            # processed concurrently). Keep the clip on tmpfs when available
+            # so the write + upload round-trip never touches disk.
+            base_name = os.path.splitext(os.path.basename(result_video_path))[0]
+            tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            final_video_filepath = os.path.join(tmp_dir, f"{base_name}_slowed.mp4")
 
-            # Get fps from the video
-            cap = cv2.VideoCapture(result_video_path)
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
-            if fps <= 0:
-                fps = 30
-            cap.release()
-
-            ffmpeg_cmd = f"ffmpeg -y -an -i \"{result_video_path}\" -vf \"setpts={self.slowdown_factor}*PTS\" -r {fps} -map_metadata 0 \"{final_video_filepath}\" -loglevel quiet"
+            # -itsscale stretches the container timestamps without decoding or
+            # re-encoding a single frame (-c copy), so the slowdown is a pure
+            # remux instead of a full x264 encode pass
+            ffmpeg_cmd = f"ffmpeg -y -itsscale {self.slowdown_factor} -i \"{result_video_path}\" -c copy -an -map_metadata 0 \"{final_video_filepath}\" -loglevel quiet"
 
             self.logger.info(f"Slowing down video by factor of {self.slowdown_factor}")
             if os.system(ffmpeg_cmd) != 0:
@@ -316,22 +461,14 @@ class BatchVideoProcessor:
             video_file = gemini_client.files.upload(file=final_video_filepath)
 
             # Wait for video file to be processed
-            while True:
-                file_info = gemini_client.files.get(name=video_file.name)
-                if file_info.state == "ACTIVE":
-                    break
-                time.sleep(1)
+            self._wait_until_active(video_file)
 
             # Upload frame 42 image if available
             image_file = None
             if frame_42_path and os.path.exists(frame_42_path):
                 self.logger.info("Uploading frame 42 image for player identification...")
                 image_file = gemini_client.files.upload(file=frame_42_path)
-                while True:
-                    file_info = gemini_client.files.get(name=image_file.name)
-                    if file_info.state == "ACTIVE":
-                        break
-                    time.sleep(1)
+                self._wait_until_active(image_file)
 
             # Build prompt
             if image_file:
@@ -415,22 +552,6 @@ keep the following in mind:
             self.logger.error(f"Error extracting match stats: {e}")
             return None
 
-    def get_player(self, player_name: str) -> Optional[dict]:
-        """Get or create a player in the database"""
-        if not supabase_client:
-            return None
-
-        try:
-            response = (
-                supabase_client.table("players")
-                .upsert({"display_name": player_name}, on_conflict="display_name")
-                .execute()
-            )
-            return response.data[0]
-        except Exception as e:
-            self.logger.error(f"Error getting/creating player {player_name}: {e}")
-            return None
-
     def update_player_elo(self, player_id: str, elo: int):
         """Update a player's ELO in the database"""
         if not supabase_client:
@@ -479,7 +600,7 @@ keep the following in mind:
 
             # Skip matches with unknown players
             for stat in stats:
-                if re.match(r"^Player \d+$", stat.player_name) or re.match(r"^P\d+$", stat.player_name) or re.match(r"^P \d+$", stat.player_name):
+                if UNKNOWN_NAME_RE.match(stat.player_name):
                     self.logger.warning("Match has unknown players (Player 1,2,3,etc.), skipping database save")
                     return False
 
@@ -495,16 +616,31 @@ keep the following in mind:
 
             players = []
             winners = []
+            participant_rows = []
 
             self.logger.info(f"Saving match stats to database (Match ID: {match_id}, Created: {created_at})")
 
+            # Upsert every player in one round-trip instead of one per player
+            unique_names = list(dict.fromkeys(stat.player_name for stat in stats))
+            try:
+                response = (
+                    supabase_client.table("players")
+                    .upsert([{"display_name": name} for name in unique_names], on_conflict="display_name")
+                    .execute()
+                )
+                players_by_name = {p['display_name']: p for p in response.data}
+            except Exception as e:
+                self.logger.error(f"Error getting/creating players: {e}")
+                return False
+
             for stat in stats:
-                player = self.get_player(stat.player_name)
+                player = players_by_name.get(stat.player_name)
                 if player is None:
                     continue
 
-                # Save match participant with same created_at as match
-                supabase_client.table("match_participants").insert({
+                # Participant rows share the match's created_at; collect them
+                # for a single batched insert below
+                participant_rows.append({
                     "player": player['id'],
                     "smash_character": stat.smash_character.upper(),
                     "is_cpu": stat.is_cpu,
@@ -514,7 +650,7 @@ keep the following in mind:
                     "has_won": stat.has_won,
                     "match_id": match_id,
                     "created_at": created_at.isoformat(),
-                }).execute()
+                })
 
                 players.append({
                     "id": player['id'],
@@ -530,6 +666,10 @@ keep the following in mind:
                 if stat.has_won:
                     winners.append(player['display_name'])
 
+            # Save all match participants in one insert
+            if participant_rows:
+                supabase_client.table("match_participants").insert(participant_rows).execute()
+
             # Print match results
             self.logger.info("=" * 60)
             self.logger.info("MATCH RESULTS")
@@ -581,58 +721,54 @@ keep the following in mind:
             self.logger.error(f"Error saving match stats: {e}")
             return False
 
-    def process_video(self, video_path: str) -> bool:
-        """Process a single full match video file"""
+    def prepare_video(self, video_path: str) -> Optional[dict]:
+        """
+        CPU-bound stage: extract the result screen and frame 42 to disk.
+        Returns a dict describing the prepared artifacts, or None on failure.
+        Safe to run in a worker process.
+        """
         filename = os.path.basename(video_path)
         self.logger.info(f"\n{'='*60}")
         self.logger.info(f"Processing: {filename}")
         self.logger.info(f"{'='*60}")
 
-        # Get file creation time
-        created_at = get_file_creation_time(video_path)
-        self.logger.info(f"File creation time: {created_at}")
-
-        if self.dry_run:
-            self.logger.info(f"[DRY RUN] Would process {filename} with created_at={created_at}")
-            return True
-
-        # Extract result screen from the full match video
-        result_frames, frame_42_image, fps = self.extract_result_screen(video_path)
-
-        if result_frames is None:
-            self.logger.error(f"Failed to extract result screen from {filename}")
-            return False
-
-        # Create result screen video (saved to result_screens directory)
-        result_video_path = self.create_result_video(result_frames, fps, filename)
-        if result_video_path is None:
-            self.logger.error(f"Failed to create result video for {filename}")
-            return False
-
-        # Save frame 42 image to result_screens directory if available
-        frame_42_path = None
-        if frame_42_image is not None:
-            base_name = os.path.splitext(filename)[0]
-            frame_42_path = os.path.join(self.result_screens_dir, f"{base_name}_frame_42.png")
-            cv2.imwrite(frame_42_path, frame_42_image)
-            self.logger.info(f"Saved frame 42 image: {base_name}_frame_42.png")
-
-        # Extract match stats using Gemini
-        match_stats = self.get_match_stats(result_video_path, frame_42_path)
+        try:
+            # Get file creation time
+            created_at = get_file_creation_time(video_path)
+            self.logger.info(f"File creation time: {created_at}")
 
-        if not match_stats:
-            self.logger.error(f"Failed to extract match stats from {filename}")
-            return False
+            # Locate result screen in the full match video
+            start_frame, frame_42_image, fps = self.extract_result_screen(video_path)
 
-        # Save to database with the file's creation time
-        success = self.save_match_stats(match_stats, created_at)
+            if start_frame is None:
+                self.logger.error(f"Failed to extract result screen from {filename}")
+                return None
 
-        if success:
-            self.logger.info(f"Successfully processed and saved: {filename}")
-        else:
-            self.logger.warning(f"Match results extracted but not saved to database: {filename}")
+            # Create result screen video (saved to result_screens directory)
+            result_video_path = self.create_result_video(video_path, start_frame, fps, filename)
+            if result_video_path is None:
+                self.logger.error(f"Failed to create result video for {filename}")
+                return None
 
-        return success
+            # Save frame 42 image to result_screens directory if available
+            frame_42_path = None
+            if frame_42_image is not None:
+                base_name = os.path.splitext(filename)[0]
+                # WebP at quality 90 encodes faster and ~half the bytes of
+                # default-level PNG for these screenshots
+                frame_42_path = os.path.join(self.result_screens_dir, f"{base_name}_frame_42.webp")
+                cv2.imwrite(frame_42_path, frame_42_image, [cv2.IMWRITE_WEBP_QUALITY, 90])
+                self.logger.info(f"Saved frame 42 image: {base_name}_frame_42.webp")
+
+            return {
+                'filename': filename,
+                'created_at': created_at,
+                'result_video_path': result_video_path,
+                'frame_42_path': frame_42_path,
+            }
+        except Exception as e:
+            self.logger.error(f"Error extracting from {filename}: {e}")
+            return None
 
     def process_all(self):
         """Process all videos in the directory"""
@@ -644,22 +780,64 @@ keep the following in mind:
 
         self.logger.info(f"Found {len(video_files)} video files to process")
 
-        for i, video_path in enumerate(video_files, 1):
-            self.logger.info(f"\n[{i}/{len(video_files)}] Processing...")
+        if self.dry_run:
+            for video_path in video_files:
+                created_at = get_file_creation_time(video_path)
+                self.logger.info(f"[DRY RUN] Would process {os.path.basename(video_path)} with created_at={created_at}")
+                self.processed_count += 1
+            return
+
+        # Stage 1: extraction is CPU-bound and independent per video, so fan
+        # it out across worker processes
+        self.logger.info(f"Extracting result screens with {self.workers} worker(s)...")
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                prepared_videos = list(executor.map(self.prepare_video, video_files))
+        else:
+            prepared_videos = [self.prepare_video(p) for p in video_files]
+
+        # Stage 2: Gemini uploads/analysis are network-bound, so overlap them
+        # with a bounded thread pool. Database writes stay serial because the
+        # ELO updates read-modify-write player rows.
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stats_futures = [
+                executor.submit(self.get_match_stats, p['result_video_path'], p['frame_42_path'])
+                if p is not None else None
+                for p in prepared_videos
+            ]
+
+            for i, (prepared, future) in enumerate(zip(prepared_videos, stats_futures), 1):
+                self.logger.info(f"\n[{i}/{len(prepared_videos)}] Analyzing...")
+
+                if prepared is None:
+                    self.failed_count += 1
+                    continue
+
+                try:
+                    match_stats = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error processing {prepared['filename']}: {e}")
+                    self.failed_count += 1
+                    continue
+
+                if not match_stats:
+                    self.logger.error(f"Failed to extract match stats from {prepared['filename']}")
+                    self.failed_count += 1
+                    continue
+
+                try:
+                    success = self.save_match_stats(match_stats, prepared['created_at'])
+                except Exception as e:
+                    self.logger.error(f"Error processing {prepared['filename']}: {e}")
+                    self.failed_count += 1
+                    continue
 
-            try:
-                success = self.process_video(video_path)
                 if success:
+                    self.logger.info(f"Successfully processed and saved: {prepared['filename']}")
                     self.processed_count += 1
                 else:
+                    self.logger.warning(f"Match results extracted but not saved to database: {prepared['filename']}")
                     self.skipped_count += 1
-            except Exception as e:
-                self.logger.error(f"Error processing {video_path}: {e}")
-                self.failed_count += 1
-
-            # Small delay between API calls to avoid rate limiting
-            if not self.dry_run and i < len(video_files):
-                time.sleep(2)
 
         # Print summary
         self.logger.info("\n" + "=" * 60)
@@ -676,6 +854,7 @@ def main():
     parser.add_argument('directory', type=str, help='Path to directory containing video files')
     parser.add_argument('--slowdown', type=int, default=10, help='Video slowdown factor for Gemini (default: 10)')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be processed without actually processing')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for result screen extraction (default: half the CPU cores)')
 
     args = parser.parse_args()
 
@@ -683,7 +862,7 @@ def main():
         print(f"Error: Directory not found: {args.directory}")
         sys.exit(1)
 
-    processor = BatchVideoProcessor(args.directory, args.slowdown, args.dry_run)
+    processor = BatchVideoProcessor(args.directory, args.slowdown, args.dry_run, args.workers)
     processor.process_all()
 
 
@@ -9,14 +9,20 @@ import sys
 import re
 import argparse
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple
+import threading
+import bisect
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Iterator, List, Tuple
 from pathlib import Path
 
 from dotenv import load_dotenv
+import httpx
 from supabase import create_client, Client
+from supabase.client import ClientOptions
 from tqdm import tqdm
-import pytz
 
 from youtube_uploader import upload_video, get_uploader
 
@@ -30,16 +36,118 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Filename patterns, compiled once at import
+FILENAME_ID_TS_RE = re.compile(r'^(\d+)-(\d{8}_\d{6})$')
+FILENAME_TS_RE = re.compile(r'^(\d{8}_\d{6})$')
+
+# Keep-alive pool tuning for the shared Supabase client -- without an explicit
+# pool, bursts of parallel queries can pay a fresh TCP+TLS handshake each
+SUPABASE_OPTIONS = ClientOptions(
+    httpx_client=httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=30,
+    )
+)
+
+
+def parse_db_timestamp(value: str) -> datetime:
+    """
+    Parse a Supabase created_at string. fromisoformat handles the Z suffix
+    natively on 3.11+, so only older interpreters pay for the throwaway
+    .replace() string
+    """
+    if sys.version_info >= (3, 11):
+        return datetime.fromisoformat(value)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def parse_file_timestamp(ts: str) -> datetime:
+    """
+    Parse a YYYYMMDD_HHMMSS filename timestamp by direct slicing --
+    an order of magnitude faster than datetime.strptime for a fixed format
+    """
+    return datetime(
+        int(ts[0:4]), int(ts[4:6]), int(ts[6:8]),
+        int(ts[9:11]), int(ts[11:13]), int(ts[13:15])
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def parse_filename(filename: str) -> Optional[Dict]:
+    """
+    Parse match filename to extract match_id and timestamp
+
+    Formats:
+    - {match_id}-{timestamp}.mp4  (e.g., 42-20240115_143052.mp4)
+    - {timestamp}.mp4              (e.g., 20240115_143052.mp4)
+
+    Returns dict with 'match_id' (int or None) and 'timestamp' (datetime).
+    Cached so resumed runs over the same catalog pay the parse only once
+    per distinct filename.
+    """
+    # Remove .mp4 extension (suffix slice, not a full-string replace)
+    base = filename[:-4] if filename.endswith('.mp4') else filename
+
+    # Pattern 1: match_id-timestamp
+    match = FILENAME_ID_TS_RE.match(base)
+    if match:
+        match_id = int(match.group(1))
+        timestamp = parse_file_timestamp(match.group(2))
+        return {'match_id': match_id, 'timestamp': timestamp}
+
+    # Pattern 2: timestamp only
+    match = FILENAME_TS_RE.match(base)
+    if match:
+        timestamp = parse_file_timestamp(match.group(1))
+        return {'match_id': None, 'timestamp': timestamp}
+
+    logger.warning(f"Could not parse filename: {filename}")
+    return None
+
 
 class BulkUploader:
     """Handles bulk uploading of existing match videos"""
-    
+
+    # Columns fetched for a match wherever one is looked up -- explicit
+    # projection keeps the bulk prefetch payload narrow
+    MATCH_SELECT = "id, created_at, youtube_url, match_participants(player, smash_character, is_cpu, total_kos, total_falls, total_sds, has_won)"
+
+    # How many queued youtube_url writes to accumulate before flushing.
+    # Kept at 1: the daily quota caps a run at ~5 uploads, so a larger
+    # batch would never fill and a crash mid-run would lose the URLs of
+    # videos already irreversibly published (re-uploaded as duplicates
+    # on the next run). The batching machinery stays for the day the
+    # quota ceiling rises.
+    URL_FLUSH_EVERY = 1
+
+    # Ids per .in_() query -- keeps the GET query string well under URL
+    # limits on large archives
+    PREFETCH_ID_CHUNK = 200
+
+    # Rows per page for the timestamp-range prefetch; matches Supabase's
+    # default max-rows cap so truncation is detectable
+    PREFETCH_PAGE_SIZE = 1000
+
     def __init__(self, supabase_client: Client, dry_run: bool = False):
         self.supabase = supabase_client
         self.dry_run = dry_run
         self.uploader = get_uploader()
+
+        # player id -> display_name, filled in batches as matches are processed
+        self._player_name_cache: Dict[int, str] = {}
+
+        # Local index of candidate matches, populated by prefetch_matches()
+        self._matches_by_id: Dict[int, Dict] = {}
+        self._matches_by_ts: List[Tuple[datetime, Dict]] = []
+        self._ts_keys: List[datetime] = []
+        self._prefetched = False
         
-        # Statistics
+        # youtube_url writes queued until flush_youtube_urls()
+        self._pending_url_writes: List[Tuple[int, str]] = []
+        self._flush_lock = threading.Lock()
+
+        # Statistics (incremented from worker threads, so guarded by a lock)
+        self._stats_lock = threading.Lock()
         self.stats = {
             'total_files': 0,
             'already_uploaded': 0,
@@ -48,64 +156,156 @@ class BulkUploader:
             'skipped': 0
         }
     
+    def _bump(self, key: str):
+        """Thread-safe increment of a stats counter"""
+        with self._stats_lock:
+            self.stats[key] += 1
+
     def parse_filename(self, filename: str) -> Optional[Dict]:
         """
         Parse match filename to extract match_id and timestamp
-        
-        Formats:
-        - {match_id}-{timestamp}.mp4  (e.g., 42-20240115_143052.mp4)
-        - {timestamp}.mp4              (e.g., 20240115_143052.mp4)
-        
+
         Returns dict with 'match_id' (int or None) and 'timestamp' (datetime)
         """
-        # Remove .mp4 extension
-        base = filename.replace('.mp4', '')
-        
-        # Pattern 1: match_id-timestamp
-        match = re.match(r'^(\d+)-(\d{8}_\d{6})$', base)
-        if match:
-            match_id = int(match.group(1))
-            timestamp_str = match.group(2)
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-            return {'match_id': match_id, 'timestamp': timestamp}
-        
-        # Pattern 2: timestamp only
-        match = re.match(r'^(\d{8}_\d{6})$', base)
-        if match:
-            timestamp_str = match.group(1)
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-            return {'match_id': None, 'timestamp': timestamp}
-        
-        logger.warning(f"Could not parse filename: {filename}")
+        return parse_filename(filename)
+
+    def prefetch_matches(self, parsed_files: List[Dict], tolerance_seconds: int = 5):
+        """
+        Pull every candidate match for this run in two bulk queries (by id
+        and by timestamp range) and index them locally, so per-file
+        processing doesn't pay a round-trip each
+        """
+        known_ids = sorted({p['match_id'] for p in parsed_files if p.get('match_id')})
+        timestamps = [p['timestamp'] for p in parsed_files if p.get('match_id') is None]
+
+        records: Dict[int, Dict] = {}
+
+        try:
+            # Chunk the id list: one giant .in_() builds a query string that
+            # can blow past URL limits, and each chunk stays under the
+            # server's max-rows cap so nothing is silently truncated
+            for start in range(0, len(known_ids), self.PREFETCH_ID_CHUNK):
+                chunk = known_ids[start:start + self.PREFETCH_ID_CHUNK]
+                response = (
+                    self.supabase.table("matches")
+                    .select(self.MATCH_SELECT)
+                    .in_("id", chunk)
+                    .execute()
+                )
+                for record in response.data or []:
+                    records[record['id']] = record
+
+            if timestamps:
+                start_time = min(timestamps).replace(tzinfo=timezone.utc) - timedelta(seconds=tolerance_seconds)
+                end_time = max(timestamps).replace(tzinfo=timezone.utc) + timedelta(seconds=tolerance_seconds)
+                # Paginate: the default PostgREST cap would silently drop
+                # rows past 1000 on large archives
+                offset = 0
+                while True:
+                    response = (
+                        self.supabase.table("matches")
+                        .select(self.MATCH_SELECT)
+                        .gte("created_at", start_time.isoformat())
+                        .lte("created_at", end_time.isoformat())
+                        .order("created_at")
+                        .range(offset, offset + self.PREFETCH_PAGE_SIZE - 1)
+                        .execute()
+                    )
+                    page = response.data or []
+                    for record in page:
+                        records[record['id']] = record
+                    if len(page) < self.PREFETCH_PAGE_SIZE:
+                        break
+                    offset += self.PREFETCH_PAGE_SIZE
+        except Exception as e:
+            logger.error(f"Failed to prefetch matches: {e}")
+            return
+
+        self._matches_by_id = records
+
+        # Parse each created_at exactly once here; downstream lookups and
+        # metadata building reuse the stored datetime
+        by_ts = []
+        for record in records.values():
+            created_at = record.get('created_at')
+            if created_at:
+                record['_parsed_ts'] = parse_db_timestamp(created_at)
+                by_ts.append((record['_parsed_ts'], record))
+        by_ts.sort(key=lambda item: item[0])
+
+        self._matches_by_ts = by_ts
+        self._ts_keys = [ts for ts, _ in by_ts]
+        self._prefetched = True
+        logger.info(f"Prefetched {len(records)} candidate matches in bulk")
+
+    def fetch_match_by_id(self, match_id: int) -> Optional[Dict]:
+        """
+        Fetch a single match record by id -- fallback for when the bulk
+        prefetch failed, so one transient DB error degrades per file
+        instead of disabling the skip-uploaded check for the whole run
+        """
+        try:
+            response = (
+                self.supabase.table("matches")
+                .select(self.MATCH_SELECT)
+                .eq("id", match_id)
+                .execute()
+            )
+            if response.data:
+                record = response.data[0]
+                created_at = record.get('created_at')
+                if created_at:
+                    record['_parsed_ts'] = parse_db_timestamp(created_at)
+                self._matches_by_id[match_id] = record
+                return record
+        except Exception as e:
+            logger.error(f"Failed to fetch match {match_id}: {e}")
         return None
-    
+
     def find_match_by_timestamp(self, timestamp: datetime, tolerance_seconds: int = 5) -> Optional[Dict]:
         """
         Find database match by timestamp (within tolerance window)
-        
+
         Args:
             timestamp: Timestamp from filename
             tolerance_seconds: Match if within ±N seconds (default: 5)
-        
+
         Returns:
             Match record dict or None
         """
         try:
             # Convert to UTC for database comparison
-            timestamp_utc = timestamp.replace(tzinfo=pytz.UTC)
-            
+            timestamp_utc = timestamp.replace(tzinfo=timezone.utc)
+
+            # Answer from the prefetched index when available: binary search
+            # the sorted timestamps and compare the two neighbors, instead of
+            # scanning the whole list per file
+            if self._prefetched:
+                idx = bisect.bisect_left(self._ts_keys, timestamp_utc)
+                best = None
+                for neighbor in (idx - 1, idx):
+                    if 0 <= neighbor < len(self._matches_by_ts):
+                        ts, record = self._matches_by_ts[neighbor]
+                        delta = abs((ts - timestamp_utc).total_seconds())
+                        if delta <= tolerance_seconds and (best is None or delta < best[0]):
+                            best = (delta, record)
+                if best is None:
+                    logger.debug(f"No database match found for timestamp {timestamp}")
+                    return None
+                return best[1]
+
             # Query range: timestamp ± tolerance
             start_time = timestamp_utc - timedelta(seconds=tolerance_seconds)
             end_time = timestamp_utc + timedelta(seconds=tolerance_seconds)
-            
+
             response = (
                 self.supabase.table("matches")
-                .select("*, match_participants(player, smash_character, is_cpu, total_kos, total_falls, total_sds, has_won)")
+                .select(self.MATCH_SELECT)
                 .gte("created_at", start_time.isoformat())
                 .lte("created_at", end_time.isoformat())
                 .execute()
             )
-            
+
             if response.data and len(response.data) > 0:
                 # Return closest match
                 matches = response.data
@@ -115,7 +315,7 @@ class BulkUploader:
                 # Multiple matches found - pick closest
                 logger.warning(f"Found {len(matches)} matches near {timestamp}, using closest")
                 closest = min(matches, key=lambda m: abs(
-                    (datetime.fromisoformat(m['created_at'].replace('Z', '+00:00')) - timestamp_utc).total_seconds()
+                    (parse_db_timestamp(m['created_at']) - timestamp_utc).total_seconds()
                 ))
                 return closest
             
@@ -126,25 +326,44 @@ class BulkUploader:
             logger.error(f"Error finding match by timestamp: {e}")
             return None
     
+    def get_player_names(self, player_ids: List[int]) -> Dict[int, str]:
+        """
+        Resolve player IDs to display names with a single batched query
+        for any IDs not already cached
+        """
+        missing = [pid for pid in player_ids if pid not in self._player_name_cache]
+
+        if missing:
+            try:
+                response = (
+                    self.supabase.table("players")
+                    .select("id, display_name")
+                    .in_("id", missing)
+                    .execute()
+                )
+                for row in response.data or []:
+                    self._player_name_cache[row['id']] = row.get('display_name', 'Unknown')
+            except Exception as e:
+                logger.warning(f"Failed to fetch player names: {e}")
+
+        return {pid: self._player_name_cache.get(pid, 'Unknown') for pid in player_ids}
+
     def get_match_metadata(self, match_record: Dict) -> Dict:
         """Build metadata dict from database match record"""
         try:
             players = []
             participants = match_record.get('match_participants', [])
-            
+
+            # One batched name lookup for all participants instead of a
+            # query per participant
+            player_names = self.get_player_names(
+                [p.get('player') for p in participants if p.get('player')]
+            )
+
             for p in participants:
-                # Get player name from database
                 player_id = p.get('player')
-                player_name = "Unknown"
-                
-                if player_id:
-                    try:
-                        player_response = self.supabase.table("players").select("display_name").eq("id", player_id).execute()
-                        if player_response.data and len(player_response.data) > 0:
-                            player_name = player_response.data[0].get('display_name', 'Unknown')
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch player name: {e}")
-                
+                player_name = player_names.get(player_id, 'Unknown') if player_id else 'Unknown'
+
                 players.append({
                     'name': player_name,
                     'character': p.get('smash_character', 'Unknown'),
@@ -154,12 +373,11 @@ class BulkUploader:
                     'won': p.get('has_won', False)
                 })
             
-            # Get timestamp
-            created_at = match_record.get('created_at')
-            if created_at:
-                timestamp = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            else:
-                timestamp = datetime.now()
+            # Get timestamp (already parsed at prefetch when available)
+            timestamp = match_record.get('_parsed_ts')
+            if timestamp is None:
+                created_at = match_record.get('created_at')
+                timestamp = parse_db_timestamp(created_at) if created_at else datetime.now()
             
             return {
                 'players': players,
@@ -178,31 +396,36 @@ class BulkUploader:
             'timestamp': timestamp
         }
     
-    def is_already_uploaded(self, match_id: Optional[int]) -> bool:
-        """Check if match already has youtube_url in database"""
-        if match_id is None:
-            return False
-        
-        try:
-            response = self.supabase.table("matches").select("youtube_url").eq("id", match_id).execute()
-            if response.data and len(response.data) > 0:
-                youtube_url = response.data[0].get('youtube_url')
-                return youtube_url is not None and youtube_url != ''
-        except Exception as e:
-            logger.warning(f"Error checking upload status: {e}")
-        
-        return False
-    
     def save_youtube_url(self, match_id: int, youtube_url: str) -> bool:
-        """Save YouTube URL to database"""
+        """
+        Queue a YouTube URL write; flushed every URL_FLUSH_EVERY writes
+        and once at the end of the run, so a published video's URL never
+        outlives the process that uploaded it
+        """
+        with self._flush_lock:
+            self._pending_url_writes.append((match_id, youtube_url))
+            should_flush = len(self._pending_url_writes) >= self.URL_FLUSH_EVERY
+        if should_flush:
+            self.flush_youtube_urls()
+        return True
+
+    def flush_youtube_urls(self) -> bool:
+        """Write all queued YouTube URLs to the database in one upsert"""
+        with self._flush_lock:
+            pending, self._pending_url_writes = self._pending_url_writes, []
+
+        if not pending:
+            return True
+
         try:
-            self.supabase.table("matches").update({
-                "youtube_url": youtube_url
-            }).eq("id", match_id).execute()
-            logger.debug(f"Saved YouTube URL for match {match_id}")
+            self.supabase.table("matches").upsert([
+                {"id": match_id, "youtube_url": youtube_url}
+                for match_id, youtube_url in pending
+            ]).execute()
+            logger.debug(f"Saved YouTube URLs for {len(pending)} matches")
             return True
         except Exception as e:
-            logger.error(f"Failed to save YouTube URL: {e}")
+            logger.error(f"Failed to save YouTube URLs for {len(pending)} matches: {e}")
             return False
     
     def process_video(
@@ -223,7 +446,7 @@ class BulkUploader:
         parsed = self.parse_filename(filename)
         if not parsed:
             logger.warning(f"Skipping unparseable file: {filename}")
-            self.stats['skipped'] += 1
+            self._bump('skipped')
             return False
         
         match_id = parsed['match_id']
@@ -237,23 +460,22 @@ class BulkUploader:
                 match_id = match_record['id']
                 logger.info(f"Matched {filename} to database record (Match ID: {match_id})")
         else:
-            # Fetch match record for metadata
-            try:
-                response = (
-                    self.supabase.table("matches")
-                    .select("*, match_participants(player, smash_character, is_cpu, total_kos, total_falls, total_sds, has_won)")
-                    .eq("id", match_id)
-                    .execute()
-                )
-                if response.data and len(response.data) > 0:
-                    match_record = response.data[0]
-            except Exception as e:
-                logger.warning(f"Failed to fetch match record: {e}")
+            # The prefetch already pulled this record (participants included),
+            # so the id path is a local dict lookup, not another round-trip
+            match_record = self._matches_by_id.get(match_id)
+            if match_record is None:
+                # Missing from the index (prefetch failed, or the id simply
+                # was not in the window it fetched) -- confirm with a per-id
+                # query before treating the video as never uploaded
+                match_record = self.fetch_match_by_id(match_id)
+            if match_record is None:
+                logger.warning(f"No match record found for id {match_id}")
         
-        # Check if already uploaded
-        if skip_uploaded and match_id and self.is_already_uploaded(match_id):
+        # Check if already uploaded -- the fetched record carries youtube_url,
+        # so no dedicated query is needed
+        if skip_uploaded and match_record and match_record.get('youtube_url'):
             logger.info(f"Skipping already uploaded: {filename}")
-            self.stats['already_uploaded'] += 1
+            self._bump('already_uploaded')
             return False
         
         # Build metadata
@@ -281,51 +503,53 @@ class BulkUploader:
             if match_record:
                 self.save_youtube_url(match_id, youtube_url)
             
-            self.stats['successful'] += 1
+            self._bump('successful')
             return True
         else:
             logger.error(f"Failed to upload: {filename}")
-            self.stats['failed'] += 1
+            self._bump('failed')
             return False
     
-    def scan_directory(self, directory: str) -> List[str]:
-        """Scan directory for match video files"""
-        video_files = []
-        
+    def scan_directory(self, directory: str) -> Iterator[str]:
+        """Yield match video file paths from a directory, sorted by name"""
         if not os.path.exists(directory):
             logger.warning(f"Directory not found: {directory}")
-            return video_files
-        
-        for filename in os.listdir(directory):
-            # Only process main match files (exclude result_screen files)
-            if filename.endswith('.mp4') and 'result_screen' not in filename:
-                filepath = os.path.join(directory, filename)
-                if os.path.isfile(filepath):
-                    video_files.append(filepath)
-        
-        return sorted(video_files)
+            return
+
+        # scandir's DirEntry caches stat info, so is_file() doesn't issue a
+        # second stat syscall per entry like os.path.isfile did
+        with os.scandir(directory) as entries:
+            yield from sorted(
+                entry.path for entry in entries
+                # Only process main match files (exclude result_screen files)
+                if entry.name.endswith('.mp4')
+                and 'result_screen' not in entry.name
+                and entry.is_file()
+            )
     
     def run(
-        self, 
-        directories: List[str], 
+        self,
+        directories: List[str],
         skip_uploaded: bool = True,
-        playlist_name: Optional[str] = "Smash Bros Matches"
+        playlist_name: Optional[str] = "Smash Bros Matches",
+        parallel: int = 4
     ):
         """
         Run bulk upload process
-        
+
         Args:
             directories: List of directories to scan
             skip_uploaded: Skip videos already uploaded
             playlist_name: YouTube playlist name
+            parallel: Number of concurrent uploads
         """
-        # Collect all video files
-        all_files = []
-        for directory in directories:
-            files = self.scan_directory(directory)
-            all_files.extend(files)
-            logger.info(f"Found {len(files)} videos in {directory}")
-        
+        # Chain the per-directory scans into one lazy stream; the prefetch
+        # below forces a single materialization, but no per-directory copies
+        # are built along the way
+        all_files = list(itertools.chain.from_iterable(
+            self.scan_directory(directory) for directory in directories
+        ))
+
         self.stats['total_files'] = len(all_files)
         
         if not all_files:
@@ -333,19 +557,34 @@ class BulkUploader:
             return
         
         logger.info(f"Processing {len(all_files)} video files...")
-        
-        # Process each file with progress bar
-        with tqdm(all_files, desc="Uploading videos", unit="video") as pbar:
-            for filepath in pbar:
-                filename = os.path.basename(filepath)
-                pbar.set_description(f"Uploading {filename[:30]}...")
-                
-                try:
-                    self.process_video(filepath, skip_uploaded, playlist_name)
-                except Exception as e:
-                    logger.error(f"Unexpected error processing {filename}: {e}")
-                    self.stats['failed'] += 1
-        
+
+        # Parse every filename up front and prefetch all candidate matches
+        # in bulk rather than querying per file
+        parsed_files = [
+            p for p in (self.parse_filename(os.path.basename(fp)) for fp in all_files) if p
+        ]
+        self.prefetch_matches(parsed_files)
+
+        # Uploads are network-bound, so run them through a bounded thread
+        # pool instead of one at a time
+        with tqdm(total=len(all_files), desc="Uploading videos", unit="video") as pbar:
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+                futures = {
+                    executor.submit(self.process_video, filepath, skip_uploaded, playlist_name): filepath
+                    for filepath in all_files
+                }
+                for future in as_completed(futures):
+                    filename = os.path.basename(futures[future])
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Unexpected error processing {filename}: {e}")
+                        self._bump('failed')
+                    pbar.update(1)
+
+        # Flush any queued youtube_url writes before reporting
+        self.flush_youtube_urls()
+
         # Print summary
         self.print_summary()
     
@@ -425,6 +664,13 @@ Examples:
         action='store_true',
         help='Do not add videos to playlist'
     )
+
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=4,
+        help='Number of concurrent uploads (default: 4)'
+    )
     
     args = parser.parse_args()
     
@@ -443,7 +689,7 @@ Examples:
             logger.error("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not found in environment")
             sys.exit(1)
         
-        supabase = create_client(supabase_url, supabase_key)
+        supabase = create_client(supabase_url, supabase_key, options=SUPABASE_OPTIONS)
     except Exception as e:
         logger.error(f"Failed to initialize Supabase: {e}")
         sys.exit(1)
@@ -454,7 +700,7 @@ Examples:
     if args.dry_run:
         print("\n*** DRY RUN MODE - No videos will be uploaded ***\n")
     
-    uploader.run(args.directory, skip_uploaded, playlist_name)
+    uploader.run(args.directory, skip_uploaded, playlist_name, args.parallel)
 
 
 if __name__ == "__main__":
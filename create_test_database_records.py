@@ -42,19 +42,19 @@ def create_test_matches():
     
     print("Creating test players...")
     player_ids = {}
-    
-    for player_name in test_players:
-        try:
-            response = supabase.table("players").upsert(
-                {"display_name": player_name},
-                on_conflict="display_name"
-            ).execute()
-            
-            if response.data:
-                player_ids[player_name] = response.data[0]['id']
-                print(f"  ✅ {player_name} (ID: {player_ids[player_name]})")
-        except Exception as e:
-            print(f"  ⚠️  Failed to create player {player_name}: {e}")
+
+    # One upsert for all players instead of a round-trip each
+    try:
+        response = supabase.table("players").upsert(
+            [{"display_name": name} for name in test_players],
+            on_conflict="display_name"
+        ).execute()
+
+        for record in response.data or []:
+            player_ids[record['display_name']] = record['id']
+            print(f"  ✅ {record['display_name']} (ID: {record['id']})")
+    except Exception as e:
+        print(f"  ⚠️  Failed to create players: {e}")
     
     print()
     
@@ -87,13 +87,24 @@ def create_test_matches():
     ]
     
     print("Creating test matches...")
-    
+
+    # One bulk query for every match id that already exists, instead of a
+    # per-match round-trip inside the loop
+    try:
+        existing = supabase.table("matches").select("id").in_(
+            "id", [match['id'] for match in test_matches]
+        ).execute()
+        existing_ids = {row['id'] for row in existing.data or []}
+    except Exception as e:
+        print(f"  ⚠️  Failed to check existing matches: {e}")
+        existing_ids = set()
+
+    # Participant rows accumulate here and go out in one insert at the end
+    all_participants = []
+
     for match in test_matches:
         try:
-            # Check if match already exists
-            existing = supabase.table("matches").select("id").eq("id", match['id']).execute()
-            
-            if existing.data and len(existing.data) > 0:
+            if match['id'] in existing_ids:
                 print(f"  ℹ️  Match {match['id']} already exists, skipping...")
                 continue
             
@@ -109,15 +120,15 @@ def create_test_matches():
             
             print(f"  ✅ Created Match #{match['id']} ({match['created_at']})")
             
-            # Create participants
+            # Collect participants for a single bulk insert
             for participant in match['participants']:
                 player_name = participant['player']
-                
+
                 if player_name not in player_ids:
                     print(f"    ⚠️  Skipping participant {player_name} (player not found)")
                     continue
-                
-                participant_data = {
+
+                all_participants.append({
                     'match_id': match['id'],
                     'player': player_ids[player_name],
                     'smash_character': participant['character'],
@@ -126,18 +137,23 @@ def create_test_matches():
                     'total_falls': participant['falls'],
                     'total_sds': participant['sds'],
                     'has_won': participant['won']
-                }
-                
-                supabase.table("match_participants").insert(participant_data).execute()
-                
+                })
+
                 winner_tag = " 🏆" if participant['won'] else ""
                 print(f"    - {player_name} ({participant['character']}) - "
                       f"{participant['kos']} KOs, {participant['falls']} Falls, "
                       f"{participant['sds']} SD{winner_tag}")
-            
+
         except Exception as e:
             print(f"  ❌ Error creating match {match['id']}: {e}")
-    
+
+    if all_participants:
+        try:
+            supabase.table("match_participants").insert(all_participants).execute()
+            print(f"\n  ✅ Inserted {len(all_participants)} participants in one batch")
+        except Exception as e:
+            print(f"\n  ❌ Failed to insert participants: {e}")
+
     print("\n" + "="*60)
     print("✅ Test database records created!")
     print("="*60)
@@ -6,6 +6,8 @@ Create dummy test videos for YouTube upload testing
 import cv2
 import numpy as np
 import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
 def create_dummy_video(filepath: str, duration_seconds: int = 10, text: str = "Test Video"):
@@ -21,48 +23,68 @@ def create_dummy_video(filepath: str, duration_seconds: int = 10, text: str = "T
     width = 1920
     height = 1080
     fps = 30
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    
-    # Create video writer
-    out = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
+
+    # Pipe raw frames straight into ffmpeg rather than through
+    # cv2.VideoWriter's shim: one Python->C crossing per frame, and
+    # +faststart puts the moov atom up front so the files are
+    # upload/stream friendly
+    proc = subprocess.Popen(
+        [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-c:v', 'libx264', '-preset', 'ultrafast',
+            '-movflags', '+faststart',
+            filepath
+        ],
+        stdin=subprocess.PIPE
+    )
     
     total_frames = duration_seconds * fps
-    
+    font = cv2.FONT_HERSHEY_SIMPLEX
+
+    # Precompute the per-frame color cycle in one vectorized HSV->BGR conversion
+    hues = ((np.arange(total_frames) / total_frames) * 180).astype(np.uint8)
+    hsv = np.stack([hues, np.full_like(hues, 255), np.full_like(hues, 200)], axis=-1)
+    colors_bgr = cv2.cvtColor(hsv.reshape(1, total_frames, 3), cv2.COLOR_HSV2BGR)[0]
+
+    # Pre-render the static texts once onto an overlay; per frame we only
+    # broadcast-fill the reused buffer and blit the overlay through a mask
+    overlay = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.putText(overlay, text, (50, 200), font, 3, (255, 255, 255), 4, cv2.LINE_AA)
+    filename = os.path.basename(filepath)
+    cv2.putText(overlay, filename, (50, height - 50), font, 1, (200, 200, 200), 2, cv2.LINE_AA)
+    overlay_mask = overlay.any(axis=-1, keepdims=True) | np.zeros((1, 1, 3), dtype=bool)
+
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+
     for frame_num in range(total_frames):
-        # Create a colored frame (color changes over time)
-        hue = int((frame_num / total_frames) * 180)
-        color_hsv = np.uint8([[[hue, 255, 200]]])
-        color_bgr = cv2.cvtColor(color_hsv, cv2.COLOR_HSV2BGR)[0][0]
-        
-        # Create frame with solid color
-        frame = np.full((height, width, 3), color_bgr, dtype=np.uint8)
-        
-        # Add text overlay
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        
-        # Main text
-        cv2.putText(frame, text, (50, 200), font, 3, (255, 255, 255), 4, cv2.LINE_AA)
-        
-        # Frame counter
+        # Solid color fill into the reused buffer (no per-frame allocation)
+        frame[:] = colors_bgr[frame_num]
+        np.copyto(frame, overlay, where=overlay_mask)
+
+        # Only the dynamic texts are rasterized per frame
         frame_text = f"Frame {frame_num + 1}/{total_frames}"
         cv2.putText(frame, frame_text, (50, 300), font, 1.5, (255, 255, 255), 2, cv2.LINE_AA)
-        
-        # Time counter
+
         time_elapsed = frame_num / fps
         time_text = f"Time: {time_elapsed:.2f}s / {duration_seconds}s"
         cv2.putText(frame, time_text, (50, 370), font, 1.5, (255, 255, 255), 2, cv2.LINE_AA)
-        
-        # Add filename at bottom
-        filename = os.path.basename(filepath)
-        cv2.putText(frame, filename, (50, height - 50), font, 1, (200, 200, 200), 2, cv2.LINE_AA)
-        
+
         # Write frame
-        out.write(frame)
-    
-    out.release()
+        proc.stdin.write(frame.tobytes())
+
+    proc.stdin.close()
+    proc.wait()
     print(f"✅ Created: {filepath} ({duration_seconds}s, {total_frames} frames)")
 
 
+def _create_video_worker(video: dict):
+    """Unpack one test-video spec for ProcessPoolExecutor.map"""
+    filepath = os.path.join(video['dir'], video['filename'])
+    create_dummy_video(filepath, video['duration'], video['text'])
+
+
 def main():
     """Create test videos with various naming formats"""
     
@@ -111,9 +133,9 @@ def main():
         },
     ]
     
-    for video in test_videos:
-        filepath = os.path.join(video['dir'], video['filename'])
-        create_dummy_video(filepath, video['duration'], video['text'])
+    # Each encode is CPU-bound and independent, so fan out across cores
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_create_video_worker, test_videos))
     
     print(f"\n{'='*60}")
     print("✅ Test videos created successfully!")
@@ -31,6 +31,10 @@ from elo_utils import calculate_elo_update_for_streaming, update_inactivity_stat
 # Load environment variables
 load_dotenv()
 
+# Placeholder names ("Player 1", "P1", "P 1") mean Gemini couldn't identify
+# the player; compiled once instead of three re.match calls per player
+UNKNOWN_NAME_RE = re.compile(r"^(?:Player \d+|P ?\d+)$")
+
 class PlayerStats(BaseModel):
     is_online_match: bool
     smash_character: str
@@ -102,6 +106,18 @@ class ResultVideoProcessor:
         self.logger.info(f"Slowdown factor: {self.slowdown_factor}")
         self.logger.info(f"Force save: {self.force_save}")
     
+    def _wait_until_active(self, uploaded_file):
+        """Poll a Gemini file until it is ACTIVE, backing off exponentially."""
+        # Start at 100ms so fast-processed files aren't stuck waiting out a
+        # full second; cap at 2s so slow ones aren't hammered
+        delay = 0.1
+        while True:
+            file_info = gemini_client.files.get(name=uploaded_file.name)
+            if file_info.state == "ACTIVE":
+                return
+            time.sleep(delay)
+            delay = min(delay * 1.5, 2.0)
+
     def get_match_stats(self) -> Optional[List[PlayerStats]]:
         """Extract player stats from result screen video using Gemini API"""
         if not gemini_client:
@@ -130,11 +146,7 @@ class ResultVideoProcessor:
             
             # Wait for file to be processed
             self.logger.info("Waiting for video to be processed by Gemini...")
-            while True:
-                file_info = gemini_client.files.get(name=file.name)
-                if file_info.state == "ACTIVE":
-                    break
-                time.sleep(1)
+            self._wait_until_active(file)
             
             # Prepare content for Gemini
             contents = [    
@@ -230,22 +242,6 @@ keep the following in mind:
         # Return as integers
         return round(new_rating_a), round(new_rating_b)
     
-    def get_player(self, player_name: str) -> Optional[dict]:
-        """Get or create a player in the database"""
-        if not supabase_client:
-            return None
-        
-        try:
-            response = (
-                supabase_client.table("players")
-                .upsert({"display_name": player_name}, on_conflict="display_name")
-                .execute()
-            )
-            return response.data[0]
-        except Exception as e:
-            self.logger.error(f"Error getting/creating player {player_name}: {e}")
-            return None
-    
     def update_player_elo(self, player_id: str, elo: int):
         """Update a player's ELO in the database"""
         if not supabase_client:
@@ -296,7 +292,7 @@ keep the following in mind:
                 # Skip matches with unknown players
                 match_has_unknown_players = False
                 for stat in stats:
-                    if re.match(r"^Player \d+$", stat.player_name) or re.match(r"^P\d+$", stat.player_name) or re.match(r"^P \d+$", stat.player_name):
+                    if UNKNOWN_NAME_RE.match(stat.player_name):
                         match_has_unknown_players = True
                         break
                 
@@ -316,30 +312,40 @@ keep the following in mind:
             
             players = []
             winners = []
-            
+            participant_rows = []
+
             self.logger.info(f"Saving match stats to database (Match ID: {match_id})")
-            
-            for stat in stats:
-                player = self.get_player(stat.player_name)
-                if player is None:
-                    continue
-                
-                # Save match participant
+
+            # Upsert every player in one round-trip instead of one per player
+            unique_names = list(dict.fromkeys(stat.player_name for stat in stats))
+            try:
                 response = (
-                    supabase_client.table("match_participants")
-                    .insert({
-                        "player": player['id'], 
-                        "smash_character": stat.smash_character.upper(),
-                        "is_cpu": stat.is_cpu,
-                        "total_kos": stat.total_kos,
-                        "total_falls": stat.total_falls,
-                        "total_sds": stat.total_sds,
-                        "has_won": stat.has_won,
-                        "match_id": match_id,
-                    })
+                    supabase_client.table("players")
+                    .upsert([{"display_name": name} for name in unique_names], on_conflict="display_name")
                     .execute()
                 )
-                
+                players_by_name = {p['display_name']: p for p in response.data}
+            except Exception as e:
+                self.logger.error(f"Error getting/creating players: {e}")
+                return False
+
+            for stat in stats:
+                player = players_by_name.get(stat.player_name)
+                if player is None:
+                    continue
+
+                # Collect participant rows for a single batched insert below
+                participant_rows.append({
+                    "player": player['id'],
+                    "smash_character": stat.smash_character.upper(),
+                    "is_cpu": stat.is_cpu,
+                    "total_kos": stat.total_kos,
+                    "total_falls": stat.total_falls,
+                    "total_sds": stat.total_sds,
+                    "has_won": stat.has_won,
+                    "match_id": match_id,
+                })
+
                 players.append({
                     "id": player['id'], 
                     "elo": player['elo'], 
@@ -353,7 +359,11 @@ keep the following in mind:
                 
                 if stat.has_won:
                     winners.append(player['display_name'])
-            
+
+            # Save all match participants in one insert
+            if participant_rows:
+                supabase_client.table("match_participants").insert(participant_rows).execute()
+
             # Print match results
             self.logger.info("=" * 60)
             self.logger.info("MATCH RESULTS")
@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Cloudflare R2 storage client for match artifacts
+Uploads match videos, result screen clips, and frame captures via the S3 API
+"""
+
+import io
+import os
+import logging
+import functools
+import threading
+import concurrent.futures
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+# Optional async path for event-loop callers
+try:
+    import aioboto3
+    from aiobotocore.config import AioConfig
+    AIOBOTO3_AVAILABLE = True
+except ImportError:
+    AIOBOTO3_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Above this size the AWS CRT transfer path is worth its setup cost
+CRT_THRESHOLD = 50 * MB
+
+# Cap on multipart part bodies held in memory while streaming an encode
+# (bounds RAM at roughly this many multipart chunks)
+MAX_INFLIGHT_PARTS = 4
+
+# CRC32C needs the CRT extension (botocore[crt]); without it botocore
+# raises FlexibleChecksumError on every request, so fall back to the
+# pure-Python-capable CRC32
+try:
+    from botocore.httpchecksum import HAS_CRT as _HAS_CRT
+except ImportError:
+    _HAS_CRT = False
+CHECKSUM_ALGORITHM = 'CRC32C' if _HAS_CRT else 'CRC32'
+
+
+@functools.lru_cache(maxsize=256)
+def _match_prefix(match_id: int, timestamp: str) -> str:
+    """
+    Cached matches/{year}/{month}/{match_id}-{timestamp} key prefix.
+    Callers uploading many artifacts for the same match skip rebuilding
+    the slices and f-string per upload
+    """
+    return f"matches/{timestamp[:4]}/{timestamp[4:6]}/{match_id}-{timestamp}"
+
+
+class R2StorageClient:
+    """Uploads match artifacts to a Cloudflare R2 bucket"""
+
+    def __init__(self):
+        account_id = os.getenv("R2_ACCOUNT_ID")
+        access_key = os.getenv("R2_ACCESS_KEY_ID")
+        secret_key = os.getenv("R2_SECRET_ACCESS_KEY")
+        self.bucket_name = os.getenv("R2_BUCKET_NAME", "smash-matches")
+
+        if not account_id or not access_key or not secret_key:
+            raise ValueError(
+                "R2_ACCOUNT_ID, R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY "
+                "must be set in the environment"
+            )
+
+        self.endpoint_url = f"https://{account_id}.r2.cloudflarestorage.com"
+        self.s3_client = boto3.client(
+            's3',
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name="auto",
+            # Default pool (10) is smaller than the multipart fan-out, so
+            # part uploads would serialize on free connections. Adaptive
+            # retries absorb R2 throttling without hand-rolled backoff.
+            # tcp_keepalive stops idle pool connections from being torn
+            # down between matches, which would cost a fresh TCP+TLS
+            # handshake per small frame upload.
+            config=Config(
+                max_pool_connections=50,
+                retries={'max_attempts': 10, 'mode': 'adaptive'},
+                connect_timeout=10,
+                read_timeout=60,
+                tcp_keepalive=True,
+            ),
+        )
+
+        # Multipart tuning: 50 MiB parts across 10 threads keeps the link
+        # busy for match videos instead of trickling one TCP stream.
+        # Env-tunable so operators can retune for their own uplink.
+        self._transfer_config = TransferConfig(
+            multipart_threshold=8 * MB,
+            multipart_chunksize=int(os.getenv("R2_MULTIPART_CHUNKSIZE", 50 * MB)),
+            max_concurrency=int(os.getenv("R2_MAX_CONCURRENCY", 10)),
+            use_threads=True,
+        )
+
+        # Large videos route through the AWS CRT (C-level multipart, TLS
+        # and signing) when awscrt is installed; boto3 picks it up via
+        # preferred_transfer_client='auto'. Older boto3 without the knob
+        # just reuses the classic config.
+        try:
+            self._crt_transfer_config = TransferConfig(
+                multipart_threshold=8 * MB,
+                multipart_chunksize=int(os.getenv("R2_MULTIPART_CHUNKSIZE", 50 * MB)),
+                max_concurrency=int(os.getenv("R2_MAX_CONCURRENCY", 10)),
+                preferred_transfer_client='auto',
+            )
+        except TypeError:
+            self._crt_transfer_config = self._transfer_config
+
+        # Shared pool for whole-artifact concurrency; the boto3 client is
+        # thread-safe, and 8 workers stays inside max_pool_connections
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+
+    def upload_file(self, file_path: str, object_key: str, content_type: Optional[str] = None,
+                    metadata: Optional[Dict[str, str]] = None, double_write: bool = False) -> Optional[str]:
+        """
+        Upload a local file to R2
+
+        Args:
+            file_path: Path to the local file
+            object_key: Destination key in the bucket
+            content_type: Optional Content-Type for the stored object
+            metadata: Optional object metadata to store alongside
+            double_write: Also server-side copy to '{object_key}.dup' so
+                readers polling right after the write have a fallback key
+
+        Returns:
+            The object key on success, None on failure
+        """
+        # CRC32C instead of the default MD5 when the CRT extension is
+        # installed: computed with hardware crc32 instructions, so
+        # checksumming costs far less CPU per part (CRC32 otherwise)
+        extra_args = {'ChecksumAlgorithm': CHECKSUM_ALGORITHM}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        if metadata:
+            extra_args['Metadata'] = metadata
+        # Conditional PUT: only write keys that don't exist yet, so re-runs
+        # skip the full-body re-upload in one round-trip (no HEAD + PUT)
+        extra_args['IfNoneMatch'] = '*'
+
+        try:
+            # Open once ourselves (1 MiB buffer) instead of an exists-check
+            # plus upload_file's internal reopen + stat of the same path
+            with open(file_path, 'rb', buffering=MB) as f:
+                # fstat on the open handle (no extra path lookup) decides
+                # whether the CRT path is worth engaging
+                size = os.fstat(f.fileno()).st_size
+                config = self._crt_transfer_config if size > CRT_THRESHOLD else self._transfer_config
+                try:
+                    self.s3_client.upload_fileobj(
+                        f,
+                        self.bucket_name,
+                        object_key,
+                        ExtraArgs=extra_args,
+                        Config=config,
+                    )
+                except ValueError:
+                    # Older s3transfer rejects IfNoneMatch in ExtraArgs;
+                    # retry unconditionally rather than fail the upload
+                    del extra_args['IfNoneMatch']
+                    f.seek(0)
+                    self.s3_client.upload_fileobj(
+                        f,
+                        self.bucket_name,
+                        object_key,
+                        ExtraArgs=extra_args,
+                        Config=config,
+                    )
+            logger.info("Uploaded %s -> r2://%s/%s", file_path, self.bucket_name, object_key)
+            if double_write:
+                self._write_duplicate(object_key)
+            return object_key
+        except FileNotFoundError:
+            logger.error("File not found: %s", file_path)
+            return None
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'PreconditionFailed':
+                # Object already exists with this key: idempotent success
+                logger.info("Already in R2, skipping: r2://%s/%s", self.bucket_name, object_key)
+                return object_key
+            logger.error("Failed to upload %s to R2: %s", file_path, e)
+            return None
+        except Exception as e:
+            logger.error("Failed to upload %s to R2: %s", file_path, e)
+            return None
+
+    def _write_duplicate(self, object_key: str):
+        """
+        Server-side copy to '{key}.dup' -- no bytes over the wire -- so a
+        downstream reader that races list-after-write convergence can fall
+        back to the duplicate instead of retrying with full latency
+        """
+        try:
+            self.s3_client.copy_object(
+                CopySource={'Bucket': self.bucket_name, 'Key': object_key},
+                Bucket=self.bucket_name,
+                Key=f"{object_key}.dup",
+            )
+        except Exception as e:
+            logger.warning("Failed to double-write %s: %s", object_key, e)
+
+    def upload_match_video(self, file_path: str, match_id: int, timestamp: str) -> Optional[str]:
+        """
+        Upload a full match video
+
+        Args:
+            file_path: Path to the match .mp4
+            match_id: Database match id
+            timestamp: Filename timestamp (YYYYMMDD_HHMMSS)
+        """
+        return self.upload_file(file_path, f"{_match_prefix(match_id, timestamp)}.mp4", 'video/mp4')
+
+    def upload_result_screen_video(self, file_path: str, match_id: int, timestamp: str) -> Optional[str]:
+        """Upload the slowed result-screen clip for a match"""
+        object_key = f"{_match_prefix(match_id, timestamp)}_result_screen.mp4"
+        return self.upload_file(file_path, object_key, 'video/mp4')
+
+    def upload_frame_image(self, file_path: str, match_id: int, timestamp: str, frame_number: int = 42) -> Optional[str]:
+        """
+        Upload a captured frame image (frame 42 by default)
+
+        Frames are stored as WebP -- 30-70% smaller than PNG for the same
+        pixels, so each frame costs less bandwidth and latency to ship
+        """
+        month_dir, name = _match_prefix(match_id, timestamp).rsplit('/', 1)
+        object_key = f"{month_dir}/frames/{name}_frame{frame_number}.webp"
+        return self.upload_file(file_path, object_key, 'image/webp')
+
+    def upload_match_video_stream(self, readable, match_id: int, timestamp: str) -> Optional[str]:
+        """
+        Upload a match video straight from a readable stream (e.g. ffmpeg
+        stdout via pipe:1) with manual multipart, skipping the intermediate
+        file on disk entirely
+
+        Args:
+            readable: Binary stream to read the encoded video from
+            match_id: Database match id
+            timestamp: Filename timestamp (YYYYMMDD_HHMMSS)
+
+        Returns:
+            The object key on success, None on failure
+        """
+        object_key = f"{_match_prefix(match_id, timestamp)}.mp4"
+        chunksize = self._transfer_config.multipart_chunksize
+
+        try:
+            mpu = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=object_key,
+                ContentType='video/mp4',
+            )
+            upload_id = mpu['UploadId']
+        except Exception as e:
+            logger.error("Failed to start multipart upload for %s: %s", object_key, e)
+            return None
+
+        # Backpressure: without it a fast encoder piles every remaining
+        # part body into the executor queue, buffering the whole video
+        inflight = threading.Semaphore(MAX_INFLIGHT_PARTS)
+
+        def upload_part(part_number: int, body: bytes) -> Dict:
+            try:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+            finally:
+                inflight.release()
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+        futures = []
+        try:
+            # Parts upload on the shared pool while the encoder keeps
+            # producing, so upload overlaps encode instead of following it
+            part_number = 0
+            while True:
+                inflight.acquire()
+                body = readable.read(chunksize)
+                if not body:
+                    inflight.release()
+                    break
+                part_number += 1
+                futures.append(self._executor.submit(upload_part, part_number, body))
+
+            parts = sorted(
+                (future.result() for future in futures),
+                key=lambda p: p['PartNumber'],
+            )
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+            logger.info("Streamed upload -> r2://%s/%s", self.bucket_name, object_key)
+            return object_key
+        except Exception as e:
+            logger.error("Streamed upload failed for %s: %s", object_key, e)
+            concurrent.futures.wait(futures)
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=object_key, UploadId=upload_id
+                )
+            except Exception:
+                pass
+            return None
+
+    def upload_frame_images_bulk(self, frames: List[Tuple[str, int, str, int]]) -> List[Optional[str]]:
+        """
+        Upload many frame images concurrently
+
+        Args:
+            frames: List of (file_path, match_id, timestamp, frame_number)
+
+        Returns:
+            Uploaded object keys in the same order as the input (None for
+            failed entries)
+
+        Sequential frame PUTs collapse throughput to one round-trip each;
+        fanning them 16-wide over the shared client keeps the link full.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+            futures = {
+                executor.submit(self.upload_frame_image, *frame): i
+                for i, frame in enumerate(frames)
+            }
+            results: List[Optional[str]] = [None] * len(frames)
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    # Player nameplates sit in the lower portion of the result screen;
+    # downstream identification only needs that strip
+    NAMEPLATE_TOP = 0.55
+
+    def upload_frame_array(self, frame, match_id: int, timestamp: str, frame_number: int = 42,
+                           diagnostic_mode: bool = False) -> Optional[str]:
+        """
+        Preprocess and upload a raw frame array in-memory
+
+        The identification model reads text from the nameplate strip, so by
+        default the frame is cropped to it and grayscaled before encoding --
+        a fraction of the full-resolution color payload. diagnostic_mode
+        uploads the untouched frame instead.
+        """
+        month_dir, name = _match_prefix(match_id, timestamp).rsplit('/', 1)
+        object_key = f"{month_dir}/frames/{name}_frame{frame_number}.webp"
+
+        if diagnostic_mode:
+            image = frame
+            metadata = {'roi': 'full', 'bits': '24'}
+        else:
+            h = frame.shape[0]
+            crop = frame[int(h * self.NAMEPLATE_TOP):]
+            image = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+            metadata = {'roi': 'nameplate', 'bits': '8'}
+
+        ok, encoded = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, 90])
+        if not ok:
+            logger.error("Failed to encode frame %s for match %s", frame_number, match_id)
+            return None
+
+        try:
+            self.s3_client.upload_fileobj(
+                io.BytesIO(encoded.tobytes()),
+                self.bucket_name,
+                object_key,
+                ExtraArgs={
+                    'ChecksumAlgorithm': CHECKSUM_ALGORITHM,
+                    'ContentType': 'image/webp',
+                    'Metadata': metadata,
+                },
+                Config=self._transfer_config,
+            )
+            logger.info("Uploaded frame -> r2://%s/%s", self.bucket_name, object_key)
+            return object_key
+        except Exception as e:
+            logger.error("Failed to upload frame for match %s: %s", match_id, e)
+            return None
+
+    def upload_match_bundle(self, file_paths: Dict[str, str], match_id: int, timestamp: str) -> Dict[str, Optional[str]]:
+        """
+        Upload a match's artifacts concurrently
+
+        Args:
+            file_paths: Mapping with any of 'video', 'result_screen',
+                'frame' pointing at local paths
+            match_id: Database match id
+            timestamp: Filename timestamp (YYYYMMDD_HHMMSS)
+
+        Returns:
+            Mapping of the same keys to uploaded object keys (or None)
+
+        The three artifacts are independent network transfers, so they go
+        through the shared executor instead of serializing three round-trips.
+        """
+        uploaders = {
+            'video': self.upload_match_video,
+            'result_screen': self.upload_result_screen_video,
+            'frame': self.upload_frame_image,
+        }
+
+        futures = {
+            name: self._executor.submit(uploaders[name], path, match_id, timestamp)
+            for name, path in file_paths.items()
+            if name in uploaders and path
+        }
+        concurrent.futures.wait(futures.values())
+
+        return {name: future.result() for name, future in futures.items()}
+
+    def match_context(self, match_id: int, timestamp: str) -> "_MatchUploadContext":
+        """Build a reusable upload context for one match's artifacts"""
+        return _MatchUploadContext(self, match_id, timestamp)
+
+    @functools.cached_property
+    def public_url_prefix(self) -> Optional[str]:
+        """Fixed public URL base, computed once per client instance"""
+        public_base = os.getenv("R2_PUBLIC_URL")
+        if not public_base:
+            return None
+        return f"{public_base.rstrip('/')}/"
+
+    def get_public_url(self, object_key: str) -> Optional[str]:
+        """Build the public URL for an object, if R2_PUBLIC_URL is configured"""
+        if self.public_url_prefix is None:
+            return None
+        return self.public_url_prefix + object_key
+
+
+class _MatchUploadContext:
+    """
+    Per-match upload context: the object keys and shared metadata are
+    computed once here, so uploading N artifacts for the same match
+    doesn't rebuild the same slices and dicts N times
+    """
+
+    def __init__(self, client: R2StorageClient, match_id: int, timestamp: str):
+        self._client = client
+        prefix = _match_prefix(match_id, timestamp)
+        month_dir, name = prefix.rsplit('/', 1)
+
+        self.video_key = f"{prefix}.mp4"
+        self.result_screen_key = f"{prefix}_result_screen.mp4"
+        self._frame_key_prefix = f"{month_dir}/frames/{name}_frame"
+        self.metadata = {'match-id': str(match_id), 'timestamp': timestamp}
+
+    def upload_video(self, file_path: str) -> Optional[str]:
+        return self._client.upload_file(file_path, self.video_key, 'video/mp4', self.metadata)
+
+    def upload_result_screen(self, file_path: str) -> Optional[str]:
+        return self._client.upload_file(file_path, self.result_screen_key, 'video/mp4', self.metadata)
+
+    def upload_frame(self, file_path: str, frame_number: int = 42) -> Optional[str]:
+        object_key = f"{self._frame_key_prefix}{frame_number}.webp"
+        return self._client.upload_file(file_path, object_key, 'image/webp', self.metadata)
+
+
+# Global client instance (created on first use)
+_client_instance = None
+
+
+def get_r2_client() -> R2StorageClient:
+    """
+    Get or create global R2 client instance
+
+    boto3 client construction loads service models and resolves endpoints
+    (tens of ms); call sites should share this one instead of building a
+    client per operation. Same pattern as youtube_uploader.get_uploader().
+    """
+    global _client_instance
+    if _client_instance is None:
+        _client_instance = R2StorageClient()
+    return _client_instance
+
+
+class AsyncR2StorageClient:
+    """
+    Async twin of R2StorageClient for event-loop callers (requires aioboto3)
+
+    A blocking upload stalls the whole loop for the round-trip; this client
+    keeps uploads cooperative so other coroutines keep running.
+    """
+
+    def __init__(self):
+        if not AIOBOTO3_AVAILABLE:
+            raise ImportError("aioboto3 is required for AsyncR2StorageClient")
+
+        account_id = os.getenv("R2_ACCOUNT_ID")
+        self._access_key = os.getenv("R2_ACCESS_KEY_ID")
+        self._secret_key = os.getenv("R2_SECRET_ACCESS_KEY")
+        self.bucket_name = os.getenv("R2_BUCKET_NAME", "smash-matches")
+
+        if not account_id or not self._access_key or not self._secret_key:
+            raise ValueError(
+                "R2_ACCOUNT_ID, R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY "
+                "must be set in the environment"
+            )
+
+        self._endpoint_url = f"https://{account_id}.r2.cloudflarestorage.com"
+        self._session = aioboto3.Session()
+        self._config = AioConfig(
+            max_pool_connections=50,
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+            connect_timeout=10,
+            read_timeout=60,
+        )
+        self._transfer_config = TransferConfig(
+            multipart_threshold=8 * MB,
+            multipart_chunksize=int(os.getenv("R2_MULTIPART_CHUNKSIZE", 50 * MB)),
+            max_concurrency=int(os.getenv("R2_MAX_CONCURRENCY", 10)),
+        )
+
+    def _client(self):
+        return self._session.client(
+            's3',
+            endpoint_url=self._endpoint_url,
+            aws_access_key_id=self._access_key,
+            aws_secret_access_key=self._secret_key,
+            region_name="auto",
+            config=self._config,
+        )
+
+    async def upload_file(self, file_path: str, object_key: str, content_type: Optional[str] = None) -> Optional[str]:
+        """Async upload of a local file to R2; mirrors R2StorageClient.upload_file"""
+        extra_args = {'ChecksumAlgorithm': CHECKSUM_ALGORITHM}
+        if content_type:
+            extra_args['ContentType'] = content_type
+
+        try:
+            async with self._client() as s3:
+                with open(file_path, 'rb', buffering=MB) as f:
+                    await s3.upload_fileobj(
+                        f,
+                        self.bucket_name,
+                        object_key,
+                        ExtraArgs=extra_args,
+                        Config=self._transfer_config,
+                    )
+            logger.info("Uploaded %s -> r2://%s/%s", file_path, self.bucket_name, object_key)
+            return object_key
+        except FileNotFoundError:
+            logger.error("File not found: %s", file_path)
+            return None
+        except Exception as e:
+            logger.error("Failed to upload %s to R2: %s", file_path, e)
+            return None
+
+    async def upload_match_video(self, file_path: str, match_id: int, timestamp: str) -> Optional[str]:
+        """Async upload of a full match video"""
+        object_key = f"matches/{timestamp[:4]}/{timestamp[4:6]}/{match_id}-{timestamp}.mp4"
+        return await self.upload_file(file_path, object_key, 'video/mp4')
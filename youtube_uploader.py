@@ -6,17 +6,25 @@ Handles OAuth authentication and video uploads to YouTube.
 
 import os
 import sys
+import json
+import time
+import random
 import pickle
 import logging
-from typing import Optional, Dict, List
-from datetime import datetime
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, List, Tuple
+from datetime import datetime, timedelta
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-import httplib2
+# The Google client stack imports hundreds of modules; defer it to
+# get_authenticated_service so importing this module for title/tag
+# formatting stays cheap. Only HttpError is needed at module scope (for
+# except clauses), and it gets a stand-in when the stack isn't installed.
+try:
+    from googleapiclient.errors import HttpError
+except ImportError:
+    class HttpError(Exception):
+        pass
 
 # OAuth 2.0 scope for uploading videos
 YOUTUBE_UPLOAD_SCOPE = ["https://www.googleapis.com/auth/youtube.upload"]
@@ -25,9 +33,37 @@ YOUTUBE_API_VERSION = "v3"
 CLIENT_SECRETS_FILE = "client_secrets.json"
 CREDENTIALS_FILE = "youtube-upload-credentials.pickle"
 
+# Static discovery document; fetch once with:
+#   curl -o youtube_v3_discovery.json \
+#     "https://youtube.googleapis.com/\$discovery/rest?version=v3"
+DISCOVERY_FILE = "youtube_v3_discovery.json"
+
+# Resolved playlist IDs persist here so restarts skip the 50-playlist
+# relist (playlist IDs don't expire, so no TTL)
+PLAYLIST_CACHE_FILE = "youtube-playlist-cache.json"
+
+# Static tag data for build_tags -- placeholder names never become tags
+_BASE_TAGS = ("super smash bros", "smash ultimate", "ssbu", "gameplay", "competitive")
+_GENERIC_NAMES = frozenset({'unknown', 'player 1', 'player 2', 'player 3', 'player 4'})
+
+# HTTP statuses worth retrying during a resumable upload (429 included:
+# rate limiting is transient and usually carries a Retry-After)
+RETRIABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# googleapiclient already serializes request bodies with compact JSON
+# separators, but at DEBUG it also re-serializes every body just to log
+# it. Cap its loggers at WARNING so verbose runs don't pay that cost.
+for _name in ("googleapiclient.discovery", "googleapiclient.http"):
+    logging.getLogger(_name).setLevel(logging.WARNING)
+
+
+def _midnight_after(t: float) -> float:
+    """Epoch seconds of the next UTC midnight after t"""
+    return (int(t) // 86400 + 1) * 86400
+
 
 class YouTubeUploader:
     """Handles YouTube video uploads with OAuth authentication"""
@@ -35,14 +71,70 @@ class YouTubeUploader:
     def __init__(self):
         self.youtube = None
         self.daily_upload_count = 0
-        self.last_reset_date = datetime.now().date()
+        self._next_day_epoch = _midnight_after(time.time())
         self.default_playlist_id = None
+
+        # playlist_name -> playlist_id, persisted across runs
+        try:
+            with open(PLAYLIST_CACHE_FILE) as f:
+                self._playlist_cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._playlist_cache = {}
+
+        # Guards authentication (build the service exactly once), the
+        # daily counter, and playlist resolution when uploads run on
+        # worker threads. Reentrant because playlist resolution may
+        # authenticate while holding it.
+        self._lock = threading.RLock()
+
+        # Transport used to build the service, plus the live credentials
+        # and their expiry so repeat calls can skip the pickle load
+        self._http = None
+        self._credentials = None
+        self._creds_expiry: Optional[datetime] = None
+
+        # httplib2.Http is not thread-safe, so each upload worker gets its
+        # own AuthorizedHttp (handed to execute()/next_chunk() per call)
+        self._thread_http = threading.local()
+
+        # Background worker so recording the next match can overlap the
+        # previous match's upload; futures tracked per match for wait_all()
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._pending: Dict[int, Future] = {}
         
     def get_authenticated_service(self) -> Optional[object]:
         """
         Authenticate with YouTube API using OAuth 2.0
         Returns authenticated YouTube service client
         """
+        # Serialize authentication so concurrent upload workers build the
+        # service exactly once
+        with self._lock:
+            return self._get_authenticated_service_locked()
+
+    def _get_authenticated_service_locked(self) -> Optional[object]:
+        import httplib2
+        from google.auth.transport.requests import Request
+        from google_auth_httplib2 import AuthorizedHttp
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build, build_from_document
+
+        if self.youtube:
+            # Token known-fresh: skip the pickle load and validity dance
+            if self._creds_expiry and datetime.utcnow() < self._creds_expiry - timedelta(minutes=5):
+                return self.youtube
+            # Near expiry: refresh in place. The service and AuthorizedHttp
+            # share this mutable credentials object, so no rebuild needed.
+            if self._credentials and self._credentials.refresh_token:
+                try:
+                    self._credentials.refresh(Request())
+                    self._creds_expiry = self._credentials.expiry
+                    return self.youtube
+                except Exception as e:
+                    logger.warning(f"In-place credential refresh failed: {e}")
+            else:
+                return self.youtube
+
         credentials = None
         
         # Load saved credentials if they exist
@@ -86,33 +178,67 @@ class YouTubeUploader:
                 logger.warning(f"Failed to save credentials: {e}")
         
         try:
-            self.youtube = build(
-                YOUTUBE_API_SERVICE_NAME, 
-                YOUTUBE_API_VERSION,
-                credentials=credentials
-            )
+            # Authorized Http for building the service; API calls pass a
+            # per-thread transport via _request_http() so each thread keeps
+            # a persistent TLS connection without sharing sockets.
+            # cache_discovery=False skips the discovery-doc disk cache
+            # probing on build.
+            self._http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=60))
+            self._credentials = credentials
+            self._creds_expiry = getattr(credentials, 'expiry', None)
+
+            # Prefer the local discovery document: saves the HTTPS fetch of
+            # the API description on every process start
+            try:
+                with open(DISCOVERY_FILE) as f:
+                    self.youtube = build_from_document(f.read(), http=self._http)
+            except FileNotFoundError:
+                self.youtube = build(
+                    YOUTUBE_API_SERVICE_NAME,
+                    YOUTUBE_API_VERSION,
+                    http=self._http,
+                    cache_discovery=False
+                )
             logger.info("Successfully authenticated with YouTube API")
             return self.youtube
         except Exception as e:
             logger.error(f"Failed to build YouTube service: {e}")
             return None
     
+    def _request_http(self):
+        """
+        Per-thread AuthorizedHttp over the shared credentials.
+        httplib2.Http shares one connection per host with no locking, so
+        concurrent execute()/next_chunk() calls must not share a transport.
+        """
+        http = getattr(self._thread_http, 'http', None)
+        if http is None or getattr(self._thread_http, 'credentials', None) is not self._credentials:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+
+            http = AuthorizedHttp(self._credentials, http=httplib2.Http(timeout=60))
+            self._thread_http.http = http
+            self._thread_http.credentials = self._credentials
+        return http
+
     def check_quota_available(self) -> bool:
         """
         Check if we're likely within daily quota limits
         Returns True if safe to upload, False if approaching limit
         """
-        # Reset counter if it's a new day
-        today = datetime.now().date()
-        if today != self.last_reset_date:
-            self.daily_upload_count = 0
-            self.last_reset_date = today
-        
-        # Conservative limit: warn at 5 uploads (leaves buffer before hitting 6)
-        if self.daily_upload_count >= 5:
-            logger.warning("Approaching daily YouTube quota limit (5+ uploads today)")
-            return False
-        
+        # Reset counter if it's a new day -- a cheap float compare against
+        # the cached day boundary instead of allocating date objects
+        with self._lock:
+            now = time.time()
+            if now >= self._next_day_epoch:
+                self.daily_upload_count = 0
+                self._next_day_epoch = _midnight_after(now)
+
+            # Conservative limit: warn at 5 uploads (leaves buffer before hitting 6)
+            if self.daily_upload_count >= 5:
+                logger.warning("Approaching daily YouTube quota limit (5+ uploads today)")
+                return False
+
         return True
     
     def get_or_create_playlist(self, playlist_name: str = "Smash Bros Matches") -> Optional[str]:
@@ -120,6 +246,17 @@ class YouTubeUploader:
         Get existing playlist ID or create new playlist
         Returns playlist ID or None on failure
         """
+        # Serialize the whole check-then-create sequence: concurrent
+        # workers racing past the cache miss would each create the
+        # playlist, leaving duplicates on the channel
+        with self._lock:
+            return self._get_or_create_playlist_locked(playlist_name)
+
+    def _get_or_create_playlist_locked(self, playlist_name: str) -> Optional[str]:
+        cached_id = self._playlist_cache.get(playlist_name)
+        if cached_id:
+            return cached_id
+
         if not self.youtube:
             if not self.get_authenticated_service():
                 return None
@@ -131,12 +268,13 @@ class YouTubeUploader:
                 mine=True,
                 maxResults=50
             )
-            response = request.execute()
+            response = request.execute(http=self._request_http())
             
             for item in response.get('items', []):
                 if item['snippet']['title'] == playlist_name:
                     playlist_id = item['id']
                     logger.info(f"Found existing playlist: {playlist_name} (ID: {playlist_id})")
+                    self._save_playlist_cache(playlist_name, playlist_id)
                     return playlist_id
             
             # Create new playlist if not found
@@ -152,14 +290,26 @@ class YouTubeUploader:
                     }
                 }
             )
-            response = request.execute()
+            response = request.execute(http=self._request_http())
             playlist_id = response['id']
             logger.info(f"Created new playlist: {playlist_name} (ID: {playlist_id})")
+            self._save_playlist_cache(playlist_name, playlist_id)
             return playlist_id
             
         except HttpError as e:
             logger.error(f"Failed to get/create playlist: {e}")
             return None
+
+    def _save_playlist_cache(self, playlist_name: str, playlist_id: str):
+        """Remember a resolved playlist ID on disk (atomic write)"""
+        self._playlist_cache[playlist_name] = playlist_id
+        try:
+            tmp_path = PLAYLIST_CACHE_FILE + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._playlist_cache, f)
+            os.replace(tmp_path, PLAYLIST_CACHE_FILE)
+        except OSError as e:
+            logger.warning("Could not write playlist cache: %s", e)
     
     def add_video_to_playlist(self, video_id: str, playlist_id: str) -> bool:
         """Add video to playlist"""
@@ -180,7 +330,7 @@ class YouTubeUploader:
                     }
                 }
             )
-            request.execute()
+            request.execute(http=self._request_http())
             logger.info(f"Added video {video_id} to playlist {playlist_id}")
             return True
         except HttpError as e:
@@ -221,60 +371,49 @@ class YouTubeUploader:
     
     def build_description(self, match_id: int, metadata: Dict) -> str:
         """Build video description from match metadata"""
-        lines = ["Super Smash Bros Ultimate Match", ""]
-        
-        # Match info
-        lines.append(f"Match ID: {match_id}")
+        parts = [f"Super Smash Bros Ultimate Match\n\nMatch ID: {match_id}\n"]
+
         timestamp = metadata.get('timestamp', datetime.now())
         if isinstance(timestamp, datetime):
-            lines.append(f"Date: {timestamp.strftime('%B %d, %Y %I:%M %p')}")
-        lines.append("")
-        
+            parts.append(f"Date: {timestamp.strftime('%B %d, %Y %I:%M %p')}\n")
+        parts.append("\n")
+
         # Player stats
-        players = metadata.get('players', [])
+        players = metadata.get('players', ())
         if players:
-            lines.append("Players:")
+            parts.append("Players:\n")
             for player in players:
                 name = player.get('name', 'Unknown')
-                char = player.get('character', 'Unknown').title()
+                # Skip .title() on the 'Unknown' sentinel
+                char = player['character'].title() if player.get('character') else 'Unknown'
                 kos = player.get('kos', 0)
                 falls = player.get('falls', 0)
                 sds = player.get('sds', 0)
-                won = player.get('won', False)
-                
-                winner_tag = " - WINNER" if won else ""
-                lines.append(f"- {name} ({char}) - {kos} KOs, {falls} Falls, {sds} SD{winner_tag}")
-            lines.append("")
-        
-        lines.append("Recorded with automated capture system")
-        
-        return "\n".join(lines)
+                winner_tag = " - WINNER" if player.get('won') else ""
+                parts.append(f"- {name} ({char}) - {kos} KOs, {falls} Falls, {sds} SD{winner_tag}\n")
+            parts.append("\n")
+
+        parts.append("Recorded with automated capture system")
+
+        return "".join(parts)
     
     def build_tags(self, metadata: Dict) -> List[str]:
         """Build video tags from metadata"""
-        tags = [
-            "super smash bros",
-            "smash ultimate",
-            "ssbu",
-            "gameplay",
-            "competitive"
-        ]
-        
-        # Add player names
-        players = metadata.get('players', [])
-        for player in players:
-            name = player.get('name', '').strip()
-            if name and name.lower() not in ['unknown', 'player 1', 'player 2', 'player 3', 'player 4']:
-                tags.append(name.lower())
-        
-        # Add character names
-        for player in players:
+        # Single pass over players, deduping as we go
+        seen = set(_BASE_TAGS)
+        tags = list(_BASE_TAGS)
+
+        for player in metadata.get('players', ()):
+            name = player.get('name', '').strip().lower()
+            if name and name not in _GENERIC_NAMES and name not in seen:
+                seen.add(name)
+                tags.append(name)
+
             char = player.get('character', '').strip().lower()
-            if char and char != 'unknown':
+            if char and char != 'unknown' and char not in seen:
+                seen.add(char)
                 tags.append(char)
-        
-        # Deduplicate and limit to 500 characters total
-        tags = list(dict.fromkeys(tags))
+
         return tags[:30]  # YouTube allows up to 500 total characters
     
     def upload_video(
@@ -296,7 +435,10 @@ class YouTubeUploader:
         Returns:
             YouTube video URL or None on failure
         """
-        if not os.path.exists(filepath):
+        # One stat validates existence and gives the size for chunk sizing
+        try:
+            file_size = os.stat(filepath).st_size
+        except FileNotFoundError:
             logger.error(f"Video file not found: {filepath}")
             return None
         
@@ -334,12 +476,21 @@ class YouTubeUploader:
                 }
             }
             
-            # Create media upload
+            # Create media upload. Bounded chunks keep memory flat regardless
+            # of video length, and a transient failure re-sends only the last
+            # chunk instead of restarting from byte 0. Bigger chunks for
+            # >1 GB files amortize the per-chunk round trip.
+            from googleapiclient.http import MediaFileUpload
+
+            chunksize = 64 * 1024 * 1024 if file_size > 1 << 30 else 16 * 1024 * 1024
             media = MediaFileUpload(
-                filepath, 
-                chunksize=-1,  # Upload entire file in one request
-                resumable=True
+                filepath,
+                chunksize=chunksize,
+                resumable=True,
+                mimetype='video/mp4'
             )
+
+            logger.debug(f"Upload size: {file_size} bytes (chunksize {chunksize})")
             
             # Execute upload
             request = self.youtube.videos().insert(
@@ -364,7 +515,8 @@ class YouTubeUploader:
             logger.info(f"Successfully uploaded video: {video_url}")
             
             # Increment upload counter
-            self.daily_upload_count += 1
+            with self._lock:
+                self.daily_upload_count += 1
             
             # Add to playlist if requested
             if playlist_name:
@@ -386,6 +538,68 @@ class YouTubeUploader:
             logger.error(f"Unexpected error during upload: {e}")
             return None
     
+    def submit_upload(self, filepath: str, match_id: int, metadata: Dict,
+                      playlist_name: Optional[str] = "Smash Bros Matches") -> Future:
+        """
+        Queue an upload on the background worker and return its Future
+
+        The caller (e.g. the recording pipeline) can start the next match
+        immediately while this upload streams; per-match cost drops from
+        t_record + t_upload to max(t_record, t_upload).
+        """
+        future = self._pool.submit(self.upload_video, filepath, match_id, metadata, playlist_name)
+        self._pending[match_id] = future
+        return future
+
+    def wait_all(self, timeout: Optional[float] = None) -> Dict[int, Optional[str]]:
+        """
+        Wait for all queued uploads to finish and return match_id -> URL
+
+        Call at shutdown so queued uploads aren't abandoned.
+        """
+        pending, self._pending = self._pending, {}
+        results: Dict[int, Optional[str]] = {}
+        futures = {future: match_id for match_id, future in pending.items()}
+
+        for future in as_completed(futures, timeout=timeout):
+            match_id = futures[future]
+            try:
+                results[match_id] = future.result()
+            except Exception as e:
+                logger.error(f"Background upload failed for match {match_id}: {e}")
+                results[match_id] = None
+
+        return results
+
+    def upload_videos(self, jobs: List[Tuple[str, int, Dict]], max_concurrency: int = 2) -> Dict[int, Optional[str]]:
+        """
+        Upload a batch of videos with bounded concurrency
+
+        Args:
+            jobs: List of (filepath, match_id, metadata) tuples
+            max_concurrency: Concurrent uploads (capped at 3; YouTube
+                throttles per-user write QPS beyond that)
+
+        Returns:
+            Dict mapping match_id to the video URL (or None on failure)
+        """
+        results: Dict[int, Optional[str]] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, 3))) as executor:
+            futures = {
+                executor.submit(self.upload_video, filepath, match_id, metadata): match_id
+                for filepath, match_id, metadata in jobs
+            }
+            for future in as_completed(futures):
+                match_id = futures[future]
+                try:
+                    results[match_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Upload failed for match {match_id}: {e}")
+                    results[match_id] = None
+
+        return results
+
     def _resumable_upload(self, request):
         """
         Execute resumable upload with retry logic
@@ -394,11 +608,14 @@ class YouTubeUploader:
         response = None
         error = None
         retry = 0
-        max_retries = 3
-        
+        max_retries = 5
+        retry_after = None
+
         while response is None and retry <= max_retries:
             try:
-                status, response = request.next_chunk()
+                status, response = request.next_chunk(http=self._request_http())
+                if status is not None:
+                    logger.debug(f"Upload progress: {status.resumable_progress} bytes sent")
                 if response is not None:
                     if 'id' in response:
                         return response
@@ -406,28 +623,36 @@ class YouTubeUploader:
                         logger.error(f"Upload failed with unexpected response: {response}")
                         return None
             except HttpError as e:
-                if e.resp.status in [500, 502, 503, 504]:
+                if e.resp.status in RETRIABLE_STATUS_CODES:
                     error = f"Retriable HTTP error {e.resp.status} occurred"
+                    retry_after = e.resp.get('retry-after')
                     logger.warning(error)
                 else:
                     raise
             except Exception as e:
                 error = f"Retriable error occurred: {e}"
                 logger.warning(error)
-            
+
             if error is not None:
                 retry += 1
                 if retry > max_retries:
                     logger.error("Max retries exceeded")
                     return None
-                
-                import time
-                import random
-                max_sleep = 2 ** retry
-                sleep_seconds = random.random() * max_sleep
+
+                # Honor the server's requested delay when given (quota waits
+                # are real); otherwise decorrelated jitter, capped at 60s
+                if retry_after is not None:
+                    try:
+                        sleep_seconds = min(60.0, float(retry_after))
+                    except ValueError:
+                        sleep_seconds = min(60.0, random.uniform(1, 3 * 2 ** retry))
+                else:
+                    sleep_seconds = min(60.0, random.uniform(1, 3 * 2 ** retry))
+                error = None
+                retry_after = None
                 logger.info(f"Sleeping {sleep_seconds:.1f} seconds and retrying...")
                 time.sleep(sleep_seconds)
-        
+
         return response
 
 